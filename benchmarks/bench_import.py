@@ -0,0 +1,62 @@
+"""Import-time benchmark for the lbol package.
+
+Starts a fresh interpreter for each run, so nothing is cached between
+imports, and reports the median time to import each module on top of
+the bare interpreter start-up, along with whether NumPy got loaded.
+
+Usage:
+
+    python benchmarks/bench_import.py [--runs N] [-o results.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ("lbol", "lbol.bc_polynomial", "lbol.luminosity",
+           "lbol.bc_batch", "lbol.luminosity_batch")
+
+TIMER = """
+import sys, time
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+print(elapsed, 'numpy' in sys.modules)
+"""
+
+def time_import(statement, runs):
+    """Returns the median import time in seconds and whether NumPy loaded."""
+    times = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, "-c", TIMER % statement], cwd=ROOT,
+            universal_newlines=True).split()
+        times.append(float(output[0]))
+    times.sort()
+    return times[len(times) // 2], output[1] == "True"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20,
+                        help="fresh interpreters per module (default 20)")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in MODULES:
+        seconds, numpy_loaded = time_import("import " + module, args.runs)
+        results.append({"module": module, "seconds": seconds,
+                        "numpy_loaded": numpy_loaded})
+        print("%-25s %8.2f ms  numpy loaded: %s"
+              % (module, 1000 * seconds, numpy_loaded))
+
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(results, outfile, indent=1)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Benchmarks for the scalar, batch and parallel luminosity paths.
+
+Times calculate_polynomial, the bolometric correction, Fbol and Lbol
+over input sizes from 1 up to --max-size, for each color type and for
+inputs which are all inside the valid color range ("in_range") or half
+outside it ("mixed"). Results are written as JSON, and can be compared
+against a stored baseline to flag regressions.
+
+Usage:
+
+    python benchmarks/bench_lbol.py -o results.json
+    python benchmarks/bench_lbol.py --save-baseline baseline.json
+    python benchmarks/bench_lbol.py --baseline baseline.json
+
+The script exits with status 1 if any benchmark is slower than the
+baseline by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import numpy as np
+import lbol.bc_batch as bc_batch
+import lbol.bc_polynomial as bc_polynomial
+import lbol.bc_table as bc_table
+import lbol.luminosity as luminosity
+import lbol.luminosity_batch as luminosity_batch
+
+COLOR_TYPES = ("BminusV", "VminusI", "BminusI")
+MIXES = ("in_range", "mixed")
+
+V_MAGNITUDE = 16.59
+V_MAGNITUDE_ERR = 0.02
+DISTANCE = 1.54E23
+DISTANCE_ERR = 0.308E23
+
+def make_colors(color_type, mix, size, rng):
+    """Draws colors inside the valid range, or half of them outside."""
+    model = bc_polynomial.MODELS[color_type]
+    colors = rng.uniform(model.range_min, model.range_max, size)
+    if mix == "mixed":
+        colors[::2] += model.range_max - model.range_min + 1.0
+    return colors
+
+def best_time(function, repeat):
+    """Returns the fastest of repeat runs of function, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def scalar_benchmarks(colors, color_type):
+    """Returns (name, function) pairs looping the scalar API."""
+    coefficients = bc_polynomial.MODELS[color_type].coefficients
+    values = colors.tolist()
+
+    def polynomial():
+        for value in values:
+            bc_polynomial.calculate_polynomial(coefficients, value)
+
+    def bolometric_correction():
+        for value in values:
+            bc_polynomial.calc_bolometric_correction(value, 0.04, color_type)
+
+    def Fbol():
+        for value in values:
+            luminosity.calc_Fbol(value, 0.04, color_type, V_MAGNITUDE,
+                                 V_MAGNITUDE_ERR)
+
+    def Lbol():
+        for value in values:
+            luminosity.calc_Lbol(value, 0.04, color_type, V_MAGNITUDE,
+                                 V_MAGNITUDE_ERR, DISTANCE, DISTANCE_ERR)
+
+    return [("calculate_polynomial", polynomial),
+            ("calc_bolometric_correction", bolometric_correction),
+            ("calc_Fbol", Fbol), ("calc_Lbol", Lbol)]
+
+def batch_benchmarks(colors, color_type, workers):
+    """Returns (name, function) pairs calling the batch API."""
+    model = bc_polynomial.MODELS[color_type]
+
+    def polynomial():
+        bc_polynomial.calculate_polynomial_and_derivative(
+            model.coefficients, colors)
+
+    def table():
+        bc_table.get_table(color_type).evaluate(np.clip(
+            colors, model.range_min, model.range_max))
+
+    def bolometric_correction():
+        bc_batch.calc_bolometric_correction_batch(colors, 0.04, color_type)
+
+    def bolometric_correction_table():
+        bc_batch.calc_bolometric_correction_batch(colors, 0.04, color_type,
+                                                  method="table")
+
+    def Fbol():
+        luminosity_batch.calc_Fbol_batch(colors, 0.04, color_type,
+                                         V_MAGNITUDE, V_MAGNITUDE_ERR)
+
+    def Lbol():
+        luminosity_batch.calc_Lbol_batch(colors, 0.04, color_type,
+                                         V_MAGNITUDE, V_MAGNITUDE_ERR,
+                                         DISTANCE, DISTANCE_ERR)
+
+    def Lbol_parallel():
+        luminosity_batch.calc_Lbol_batch(colors, 0.04, color_type,
+                                         V_MAGNITUDE, V_MAGNITUDE_ERR,
+                                         DISTANCE, DISTANCE_ERR,
+                                         workers=workers)
+
+    benchmarks = [("calculate_polynomial_and_derivative", polynomial),
+                  ("BCTable.evaluate", table),
+                  ("calc_bolometric_correction_batch", bolometric_correction),
+                  ("calc_bolometric_correction_batch[table]",
+                   bolometric_correction_table),
+                  ("calc_Fbol_batch", Fbol), ("calc_Lbol_batch", Lbol)]
+    if workers > 1:
+        benchmarks.append(("calc_Lbol_batch[workers=%d]" % workers,
+                           Lbol_parallel))
+    return benchmarks
+
+def run(max_size, max_scalar_size, workers, repeat, seed=0):
+    """Runs every benchmark and returns a list of result records."""
+    rng = np.random.default_rng(seed)
+    sizes = [10**power for power in range(int(np.log10(max_size)) + 1)]
+    results = []
+
+    for color_type in COLOR_TYPES:
+        for mix in MIXES:
+            for size in sizes:
+                colors = make_colors(color_type, mix, size, rng)
+                benchmarks = [("scalar", name, function) for name, function
+                              in scalar_benchmarks(colors, color_type)
+                              if size <= max_scalar_size]
+                benchmarks += [("batch", name, function) for name, function
+                               in batch_benchmarks(colors, color_type,
+                                                   workers)]
+                for path, name, function in benchmarks:
+                    seconds = best_time(function, repeat)
+                    results.append({"name": name, "path": path,
+                                    "color_type": color_type, "mix": mix,
+                                    "size": size, "seconds": seconds,
+                                    "seconds_per_item": seconds / size})
+                    sys.stderr.write("%-40s %-8s %-8s %9d %12.6f s\n"
+                                     % (name, color_type, mix, size,
+                                        seconds))
+    return results
+
+def _key(result):
+    return (result["name"], result["color_type"], result["mix"],
+            result["size"])
+
+def find_regressions(results, baseline, threshold, min_seconds=1e-4):
+    """Compares results against a baseline.
+
+    Args:
+        results: list of result records from run.
+        baseline: list of result records from an earlier run.
+        threshold: Ratio of new to baseline time above which a result
+            counts as a regression.
+        min_seconds: Baseline times below this are too noisy to compare
+            and are skipped.
+
+    Returns:
+        A list of (result, baseline_seconds, ratio) for each regression.
+    """
+    baseline = dict((_key(result), result["seconds"]) for result in baseline)
+    regressions = []
+    for result in results:
+        old = baseline.get(_key(result))
+        if old is None or old < min_seconds:
+            continue
+        ratio = result["seconds"] / old
+        if ratio > threshold:
+            regressions.append((result, old, ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--max-size", type=int, default=10**7,
+                        help="largest batch size (default 10^7)")
+    parser.add_argument("--max-scalar-size", type=int, default=10**4,
+                        help="largest size timed through the scalar API "
+                             "(default 10^4)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes for the parallel path")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per benchmark; the fastest is kept")
+    parser.add_argument("--baseline",
+                        help="baseline JSON to check for regressions")
+    parser.add_argument("--save-baseline",
+                        help="write results JSON as a new baseline")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio counted as a regression "
+                             "(default 1.25)")
+    args = parser.parse_args(argv)
+
+    document = {"python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": run(args.max_size, args.max_scalar_size,
+                               args.workers, args.repeat)}
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as outfile:
+                json.dump(document, outfile, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)["results"]
+        regressions = find_regressions(document["results"], baseline,
+                                       args.threshold)
+        for result, old, ratio in regressions:
+            print("REGRESSION %s %s %s size=%d: %.6f s -> %.6f s (x%.2f)"
+                  % (result["name"], result["color_type"], result["mix"],
+                     result["size"], old, result["seconds"], ratio))
+        if regressions:
+            return 1
+        print("No regressions against %s" % args.baseline)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
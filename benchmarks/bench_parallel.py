@@ -0,0 +1,78 @@
+"""Thread-pool versus process-pool benchmark for calc_Lbol_batch.
+
+Times calc_Lbol_batch on one batch of mixed color types, run serially
+and then with the "thread" and "process" backends for worker counts
+2, 4, ... up to --max-workers, and reports the speedup of each over
+the serial run. The speedup of the thread backend shows how much of
+the work NumPy does with the GIL released.
+
+Usage:
+
+    python benchmarks/bench_parallel.py [--size N] [--max-workers N]
+                                        [-o results.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import numpy as np
+import lbol.luminosity_batch as luminosity_batch
+from bench_lbol import best_time
+
+def worker_counts(max_workers):
+    """Returns 2, 4, ... up to and including max_workers."""
+    counts = []
+    count = 2
+    while count < max_workers:
+        counts.append(count)
+        count *= 2
+    return counts + [max_workers] if max_workers > 1 else []
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=10**7,
+                        help="epochs per batch (default 10^7)")
+    parser.add_argument("--max-workers", type=int,
+                        default=os.cpu_count() or 1,
+                        help="largest worker count (default: CPU count)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per measurement; the fastest is kept")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    rng = np.random.RandomState(0)
+    color_value = rng.uniform(-0.2, 1.0, args.size)
+    color_err = rng.uniform(0.01, 0.1, args.size)
+    color_type = np.array(["BminusV", "VminusI",
+                           "BminusI"])[rng.randint(0, 3, args.size)]
+    v_magnitude = rng.uniform(14.0, 19.0, args.size)
+
+    def run(workers=None, backend="process"):
+        return best_time(lambda: luminosity_batch.calc_Lbol_batch(
+            color_value, color_err, color_type, v_magnitude, 0.02, 1.54E23,
+            0.308E23, workers=workers, backend=backend), args.repeat)
+
+    serial = run()
+    results = [{"backend": "serial", "workers": 1, "seconds": serial}]
+    print("%-8s %7s %10s %8s" % ("backend", "workers", "seconds", "speedup"))
+    print("%-8s %7d %10.4f %8.2f" % ("serial", 1, serial, 1.0))
+    for backend in ("thread", "process"):
+        for workers in worker_counts(args.max_workers):
+            seconds = run(workers, backend)
+            results.append({"backend": backend, "workers": workers,
+                            "seconds": seconds})
+            print("%-8s %7d %10.4f %8.2f"
+                  % (backend, workers, seconds, serial / seconds))
+
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump({"size": args.size, "results": results}, outfile,
+                      indent=1)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Bolometric luminosities of Type II-P supernovae.
+
+Implements the bolometric corrections of Bersten, M. C., & Hamuy, M.
+(2009). The scalar API (bc_polynomial and luminosity) needs only the
+standard library. Everything built on NumPy lives in separate modules,
+which are imported the first time one of their names is used, so that
+importing lbol for the scalar API stays cheap.
+"""
+import importlib
+
+# Public names, and the submodule each one is loaded from on first use.
+_LAZY_NAMES = {
+    "calc_bolometric_correction": "bc_polynomial",
+    "calc_Fbol": "luminosity",
+    "calc_4piDsquared": "luminosity",
+    "calc_Lbol": "luminosity",
+    "calc_log_Lbol": "luminosity",
+    "calc_bolometric_correction_batch": "bc_batch",
+    "calc_Fbol_batch": "luminosity_batch",
+    "calc_4piDsquared_batch": "luminosity_batch",
+    "calc_Lbol_batch": "luminosity_batch",
+    "calc_Lbol_distance_sweep": "luminosity_batch",
+    "calc_Lbol_jacobian": "luminosity_batch",
+    "calc_log_Lbol_batch": "luminosity_batch",
+    "calc_Lbol_monte_carlo": "monte_carlo",
+    "calc_bolometric_correction_combined": "multicolor",
+    "calc_Lbol_combined": "multicolor",
+    "calc_Lbol_grouped": "grouped",
+    "calc_bolometric_correction_calibrations": "calibrations",
+    "load_calibration": "calibrations",
+    "process_catalog": "binary_io",
+    "LightCurve": "light_curve",
+    "stream_Lbol": "streaming",
+    "LbolService": "service",
+    "DiskCache": "disk_cache",
+    "LbolResult": "results",
+    "calc_Lbol_result": "results",
+}
+
+_SUBMODULES = ("bc_batch", "bc_polynomial", "bc_table", "binary_io",
+               "calibrations", "cli", "constants", "disk_cache",
+               "grouped", "instrumentation", "light_curve", "luminosity",
+               "luminosity_batch", "monte_carlo", "multicolor", "parallel",
+               "results", "service", "streaming")
+
+__all__ = sorted(_LAZY_NAMES)
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    if name not in _LAZY_NAMES:
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+    module = importlib.import_module("." + _LAZY_NAMES[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_SUBMODULES))
@@ -0,0 +1,158 @@
+import numpy as np
+from . import bc_polynomial
+from . import instrumentation
+
+# Ways of evaluating the polynomial fits. "table" interpolates from the
+# precomputed tables in the bc_table module.
+METHODS = ("polynomial", "table")
+
+# Pools the parallel module can run batches in (see its docstring.)
+BACKENDS = ("process", "thread")
+
+def _check_options(method, backend):
+    """Raises ValueError if the method or backend is not known."""
+    if method not in METHODS:
+        raise ValueError("The method given is not one of %s" % (METHODS,))
+    if backend not in BACKENDS:
+        raise ValueError("The backend given is not one of %s" % (BACKENDS,))
+
+def _color_groups(color_type, shape):
+    """Splits the epochs of a batch by color type.
+
+    Args:
+        color_type: A single color type string or BCModel, or an array
+            of color type strings which broadcasts against the color
+            values.
+        shape: Shape of the broadcast color value array.
+
+    Returns:
+        A list of (model, selection) tuples. model is the BCModel for
+        the color and selection is a boolean array picking out the
+        epochs of that color, or None if every epoch shares the same
+        color.
+    """
+    if isinstance(color_type, (str, bc_polynomial.BCModel)):
+        return [(bc_polynomial.get_model(color_type), None)]
+
+    color_type = np.broadcast_to(np.asarray(color_type), shape)
+    return [(bc_polynomial.get_model(str(name)), color_type == name)
+            for name in np.unique(color_type)]
+
+@instrumentation.timed
+def calc_bolometric_correction_batch(color_value, color_err, color_type,
+                                     workers=None, method="polynomial",
+                                     backend="process"):
+    """Calculates bolometric corrections for arrays of colors.
+
+    This is the array equivalent of calc_bolometric_correction in the
+    bc_polynomial module. Instead of returning -999 for colors outside
+    the valid range of the polynomial fit, those epochs are set to NaN
+    and flagged in the returned validity mask.
+
+    Args:
+        color_value: Array of B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from the
+            host and MWG.)
+        color_err: Array of uncertainties in the photometric colors.
+            Must broadcast against color_value.
+        color_type: String signifying which color color_value represents,
+            or an array of such strings (one per epoch). Valid values are
+            "BminusV" for B-V, "VminusI" for V-I, and "BminusI" for B-I.
+            A single BCModel may be given instead of a string.
+        workers: Number of processes (or threads) to split the epochs
+            across. By default everything runs in the calling thread.
+        method: "polynomial" to evaluate the polynomial fits directly, or
+            "table" to interpolate from a precomputed lookup table (see
+            the bc_table module for its accuracy.)
+        backend: "process" to use a pool of worker processes, or
+            "thread" to use a pool of threads in this process (see the
+            parallel module.) Only used when workers is more than 1.
+
+    Returns:
+        A tuple of numpy arrays with the broadcast shape of the inputs,
+        containing the bolometric corrections, their uncertainties, and
+        a boolean mask which is True where the color is inside the valid
+        range of the polynomial fit.
+
+        (bolometric_correction, uncertainty, valid)
+
+    Raises:
+        TypeError: A color type is not a string.
+        ValueError: A color type is not one of the three valid strings,
+            the method is not one of METHODS, or the backend is not one
+            of BACKENDS.
+    """
+    _check_options(method, backend)
+    if workers is not None and workers > 1:
+        from . import parallel
+        return parallel.calc_bolometric_correction_parallel(
+            color_value, color_err, color_type, workers, method=method,
+            backend=backend)
+
+    color_value, color_err = np.broadcast_arrays(
+        np.asarray(color_value, dtype=float),
+        np.asarray(color_err, dtype=float))
+
+    bolometric_correction, derivative, rms_err, valid = \
+        calc_bolometric_correction_derivative_batch(color_value, color_type,
+                                                    method=method)
+    uncertainty = np.hypot(np.abs(derivative) * color_err, rms_err)
+
+    return bolometric_correction, uncertainty, valid
+
+def calc_bolometric_correction_derivative_batch(color_value, color_type,
+                                                method="polynomial"):
+    """Calculates bolometric corrections and their derivatives by color.
+
+    Args:
+        color_value: Array of B-V, V-I, or B-I colors of the supernova in
+            magnitudes.
+        color_type: String signifying which color color_value represents,
+            or an array of such strings (one per epoch), or a BCModel.
+        method: "polynomial" or "table", as in
+            calc_bolometric_correction_batch.
+
+    Returns:
+        A tuple of numpy arrays with the shape of color_value, containing
+        the bolometric corrections, their derivatives with respect to the
+        color, the rms errors of the fits used, and a boolean mask which
+        is True where the color is inside the valid range of the
+        polynomial fit. All but the mask are NaN where it is False.
+
+        (bolometric_correction, derivative, rms_err, valid)
+    """
+    if method not in METHODS:
+        raise ValueError("The method given is not one of %s" % (METHODS,))
+    color_value = np.asarray(color_value, dtype=float)
+
+    bolometric_correction = np.full(color_value.shape, np.nan)
+    derivative = np.full(color_value.shape, np.nan)
+    rms_err = np.full(color_value.shape, np.nan)
+    valid = np.zeros(color_value.shape, dtype=bool)
+
+    for model, selection in _color_groups(color_type, color_value.shape):
+        in_range = ((model.range_min <= color_value) &
+                    (color_value <= model.range_max))
+        if selection is not None:
+            in_range &= selection
+        if instrumentation.enabled():
+            selected = (color_value.size if selection is None
+                        else np.count_nonzero(selection))
+            instrumentation.record_rejections(
+                model.name, selected - np.count_nonzero(in_range))
+
+        if method == "table":
+            from . import bc_table
+            polynomial, polynomial_derivative = \
+                bc_table.get_table(model).evaluate(color_value[in_range])
+        else:
+            polynomial, polynomial_derivative = \
+                bc_polynomial.calculate_polynomial_and_derivative(
+                    model.coefficients, color_value[in_range])
+
+        bolometric_correction[in_range] = polynomial
+        derivative[in_range] = polynomial_derivative
+        rms_err[in_range] = model.rms_err
+        valid |= in_range
+
+    return bolometric_correction, derivative, rms_err, valid
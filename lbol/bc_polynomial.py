@@ -1,5 +1,8 @@
-import constants
+from collections import namedtuple, OrderedDict
+from . import constants
+from . import instrumentation
 import math
+import threading
 
 def set_constants(color_type):
     """Sets the coefficients, validty range, and rms error of fit.
@@ -36,6 +39,105 @@ def set_constants(color_type):
     else:
         raise ValueError("The argument given is not a valid color")
 
+class BCModel(object):
+    """An immutable, precompiled polynomial fit for a single color.
+
+    Models are built once at import time (see MODELS) so that the
+    bolometric correction functions can be handed a model instead of
+    resolving a color string on every call.
+
+    Attributes:
+        name: The color type string, e.g. "BminusV".
+        coefficients: tuple of polynomial coefficients, lowest order
+            first.
+        derivative_coefficients: tuple of coefficients of the first
+            derivative of the polynomial, lowest order first.
+        range_min: Minimum value of the color for which the fit is valid.
+        range_max: Maximum value of the color for which the fit is valid.
+        rms_err: rms error of the polynomial fit.
+    """
+    __slots__ = ("name", "coefficients", "derivative_coefficients",
+                 "range_min", "range_max", "rms_err")
+
+    def __init__(self, name, coefficients, range_min, range_max, rms_err):
+        coefficients = tuple(float(c) for c in coefficients)
+        derivative_coefficients = tuple(order * coefficients[order]
+                                        for order in
+                                        range(1, len(coefficients)))
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "coefficients", coefficients)
+        object.__setattr__(self, "derivative_coefficients",
+                           derivative_coefficients)
+        object.__setattr__(self, "range_min", range_min)
+        object.__setattr__(self, "range_max", range_max)
+        object.__setattr__(self, "rms_err", rms_err)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BCModel objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("BCModel objects are immutable")
+
+    def __reduce__(self):
+        return (BCModel, (self.name, self.coefficients, self.range_min,
+                          self.range_max, self.rms_err))
+
+    def __repr__(self):
+        return "BCModel(%r, range=[%g, %g], rms_err=%g)" % (
+            self.name, self.range_min, self.range_max, self.rms_err)
+
+# Precompiled models for each supported color, keyed by color type.
+MODELS = dict((name, BCModel(name, *set_constants(name)))
+              for name in ("BminusV", "VminusI", "BminusI"))
+
+def _stack_models(models):
+    """Builds padded coefficient and range arrays for a list of models.
+
+    Returns:
+        A tuple containing the (colors x terms) coefficient matrix,
+        lowest order first and padded with zeros, and (colors x 1)
+        arrays of the minimum and maximum valid colors and rms errors.
+
+        (coefficients, range_min, range_max, rms_err)
+    """
+    # Imported here so that the scalar API does not load NumPy.
+    import numpy as np
+
+    terms = max(len(model.coefficients) for model in models)
+    coefficients = np.zeros((len(models), terms))
+    for row, model in enumerate(models):
+        coefficients[row, :len(model.coefficients)] = model.coefficients
+    column = lambda values: np.array(values, dtype=float)[:, np.newaxis]
+    return (coefficients,
+            column([model.range_min for model in models]),
+            column([model.range_max for model in models]),
+            column([model.rms_err for model in models]))
+
+def get_model(color_type):
+    """Looks up the precompiled polynomial fit for a color.
+
+    Args:
+        color_type: A string specifying the color combination ("BminusV",
+            "VminusI" or "BminusI"), or a BCModel, which is returned
+            unchanged.
+
+    Returns:
+        The BCModel for the color.
+
+    Raises:
+        TypeError: The argument given is not a string or a BCModel.
+        ValueError: The argument given is not one of the valid colors.
+    """
+    if isinstance(color_type, BCModel):
+        return color_type
+    try:
+        return MODELS[color_type]
+    except (KeyError, TypeError):
+        if type(color_type) != str:
+            raise TypeError("The argument given is not a string")
+        raise ValueError("The argument given is not a valid color")
+
+@instrumentation.timed
 def valid_color(color_value, range_min, range_max):
     """Checks that the color value is within the range of validity.
 
@@ -81,6 +183,7 @@ def calculate_polynomial_term(coefficient, variable, order):
     else:
         return coefficient * variable**(order)
 
+@instrumentation.timed
 def calculate_polynomial(coefficients, variable):
     """Calculates a polynomial.
 
@@ -150,6 +253,35 @@ def calculate_polynomial_derivative(coefficients, variable):
  
     return polynomial_derivative
 
+@instrumentation.timed
+def calculate_polynomial_and_derivative(coefficients, variable):
+    """Calculates a polynomial and its derivative in a single pass.
+
+    Both values are accumulated together using Horner's method, so no
+    powers of the variable are ever computed. Only arithmetic is used,
+    so the variable may be a float or a numpy array, and each
+    coefficient may be an array which broadcasts against it.
+
+    Args:
+        coefficients: list of polynomial coefficients, lowest order
+            first.
+        variable: float to plug in for the variable in the polynomial.
+
+    Returns:
+        A tuple containing the polynomial and its first derivative
+        evaluated at the variable given.
+
+        (polynomial, polynomial_derivative)
+    """
+    polynomial = 0.0
+    polynomial_derivative = 0.0
+
+    for coefficient in reversed(coefficients):
+        polynomial_derivative = polynomial_derivative * variable + polynomial
+        polynomial = polynomial * variable + coefficient
+
+    return polynomial, polynomial_derivative
+
 def quadrature_sum(x, y):
     """Calculate the quadrature sum of two variables x and y.
     """
@@ -171,16 +303,15 @@ def calc_bolometric_correction_err(color_value, color_err, color_type):
             the host and MWG.)
         color_err: Uncertainty in the photometric color.
         color_type: String signifying which color color_value
-            represents.
+            represents, or the BCModel for that color.
    """
-    coefficients = set_constants(color_type)[0]
-    rms_err = set_constants(color_type)[3]
+    model = get_model(color_type)
     
-    bc_derivative = calculate_polynomial_derivative(coefficients,
-                                                     color_value) 
+    bc_derivative = calculate_polynomial_and_derivative(model.coefficients,
+                                                        color_value)[1]
     bc_polynomial_err = abs(bc_derivative) * color_err
     bolometric_correction_uncertainty = quadrature_sum(bc_polynomial_err,
-                                                       rms_err)
+                                                       model.rms_err)
 
     return bolometric_correction_uncertainty
 
@@ -194,7 +325,8 @@ def calc_bolometric_correction(color_value, color_err, color_type):
         color_err: Uncertainty in the photometric color.
         color_type: String signifying which color color_value represents.
             Valid values are "BminusV" for B-V, "VminusI" for V-I, and
-            "BminusI" for B-I.
+            "BminusI" for B-I. A BCModel may be given instead to skip
+            the lookup.
  
     Returns:
         A tuple containing the bolometric correction for use in 
@@ -205,18 +337,138 @@ def calc_bolometric_correction(color_value, color_err, color_type):
         (bolometric_correction, uncertainty)
 
         (-999, -999) if the color is outside the valid range.
+
+        If a cache has been switched on with enable_cache, results are
+        looked up in (and stored into) that cache.
     """
-    bolometric_correction = 0.0
+    model = get_model(color_type)
+
+    cache = _cache
+    if cache is not None:
+        return cache.lookup(color_value, color_err, model)
+    return _bolometric_correction(color_value, color_err, model)
 
-    coefficients, range_min, range_max, rms_err = set_constants(color_type)
+def _bolometric_correction(color_value, color_err, model):
+    """Uncached body of calc_bolometric_correction, given a BCModel."""
+    bolometric_correction = 0.0
 
-    if valid_color(color_value, range_min, range_max):
-        bolometric_correction = calculate_polynomial(coefficients,
-                                                     color_value)
-        uncertainty = calc_bolometric_correction_err(color_value,
-                                                     color_err, color_type)
+    if valid_color(color_value, model.range_min, model.range_max):
+        bolometric_correction, bc_derivative = \
+            calculate_polynomial_and_derivative(model.coefficients,
+                                                color_value)
+        uncertainty = quadrature_sum(abs(bc_derivative) * color_err,
+                                     model.rms_err)
     else:
+        instrumentation.record_rejections(model.name)
         bolometric_correction = -999
         uncertainty = -999
 
     return bolometric_correction, uncertainty
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+class BCCache(object):
+    """A thread-safe LRU cache of bolometric corrections.
+
+    Results are keyed on (color_value, color_err, color model). If a
+    quantum is given, colors are first rounded to the nearest multiple
+    of it, and the bolometric correction is calculated at the rounded
+    color, so nearby colors share one entry and the result does not
+    depend on which of them was seen first. Whether a color is valid is
+    decided before rounding, and rounded colors are clamped to the
+    valid range. Colors outside the valid range, NaN or infinite, are
+    not cached.
+
+    Two threads missing on the same key at once may both calculate the
+    result; the cache stays consistent either way.
+
+    Args:
+        maxsize: Maximum number of entries. The least recently used
+            entry is evicted when the cache is full.
+        quantum: Optional rounding step for the color key, in
+            magnitudes.
+    """
+
+    def __init__(self, maxsize=1024, quantum=None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if quantum is not None and quantum <= 0:
+            raise ValueError("quantum must be positive")
+        self.maxsize = maxsize
+        self.quantum = quantum
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def lookup(self, color_value, color_err, color_type):
+        """Returns the cached bolometric correction, calculating on a miss.
+
+        Takes the same arguments and returns the same values as
+        calc_bolometric_correction.
+        """
+        model = get_model(color_type)
+        if not valid_color(color_value, model.range_min, model.range_max):
+            return _bolometric_correction(color_value, color_err, model)
+        if self.quantum is not None:
+            color_value = min(max(round(color_value / self.quantum) *
+                                  self.quantum, model.range_min),
+                              model.range_max)
+        key = (color_value, color_err, model)
+
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return result
+            self._misses += 1
+
+        result = _bolometric_correction(color_value, color_err, model)
+
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return result
+
+    def info(self):
+        """Returns a CacheInfo with the hit and miss counts and size."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize,
+                             len(self._entries))
+
+    def clear(self):
+        """Empties the cache and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+_cache = None
+
+def enable_cache(maxsize=1024, quantum=None):
+    """Switches on memoization of calc_bolometric_correction.
+
+    Args:
+        maxsize: Maximum number of cached results.
+        quantum: Optional rounding step for the color key (see BCCache.)
+
+    Returns:
+        The new BCCache, which replaces any previously enabled cache.
+    """
+    global _cache
+    _cache = BCCache(maxsize, quantum)
+    return _cache
+
+def disable_cache():
+    """Switches off memoization of calc_bolometric_correction."""
+    global _cache
+    _cache = None
+
+def cache_info():
+    """Returns the CacheInfo of the enabled cache, or None if it is off."""
+    cache = _cache
+    return cache.info() if cache is not None else None
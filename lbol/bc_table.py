@@ -0,0 +1,130 @@
+"""Lookup-table evaluation of the bolometric correction polynomials.
+
+Each polynomial fit is only valid over a narrow, fixed range of colors,
+so it can be replaced by a dense table. The table holds the BC and its
+derivative at evenly spaced colors across the valid range, and values
+in between are found by cubic Hermite interpolation. Evaluating a table
+costs the same few operations whatever the order of the fit: one index
+calculation, a gather from each of four coefficient columns, and a
+cubic. On 10^6 colors that is about 0.6 times the cost of
+calculate_polynomial_and_derivative for the 9-term B-I fit and 0.7 to
+0.9 times for the shorter fits; on small batches (around 10^4 colors)
+its fixed cost can make it slower than the polynomial. Inside
+calc_bolometric_correction_batch the range masks and uncertainty
+propagation dominate, so method="table" saves only a few per cent
+there. benchmarks/bench_lbol.py times both methods.
+
+With the default DEFAULT_TABLE_SIZE points, the maximum absolute error
+against calculate_polynomial over the valid range is below MAX_BC_ERROR
+in the bolometric correction and below MAX_DERIVATIVE_ERROR in its
+derivative, for all three colors. The interpolation error shrinks as the
+fourth power of the grid spacing.
+"""
+from . import bc_polynomial
+import numpy as np
+import threading
+
+DEFAULT_TABLE_SIZE = 1024
+
+# Documented (and tested) error bounds for tables of DEFAULT_TABLE_SIZE.
+MAX_BC_ERROR = 1e-9
+MAX_DERIVATIVE_ERROR = 1e-6
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+class BCTable(object):
+    """A precomputed table of bolometric corrections for one color.
+
+    Attributes:
+        model: The BCModel the table was built from.
+        size: Number of grid points across the valid color range.
+        step: Spacing of the grid points.
+    """
+    __slots__ = ("model", "size", "step", "_inverse_step", "_a", "_b", "_c",
+                 "_d")
+
+    def __init__(self, model, size=DEFAULT_TABLE_SIZE):
+        if size < 2:
+            raise ValueError("A table needs at least two points")
+        grid = np.linspace(model.range_min, model.range_max, size)
+        step = grid[1] - grid[0]
+        value, derivative = bc_polynomial.calculate_polynomial_and_derivative(
+            model.coefficients, grid)
+
+        # Per-interval cubic coefficients in the local coordinate
+        # s = (color - grid[i]) / step, from the Hermite conditions.
+        # Each coefficient is kept in its own contiguous column, so that
+        # evaluation gathers with np.take rather than through a 2-d index.
+        y0, y1 = value[:-1], value[1:]
+        m0, m1 = step * derivative[:-1], step * derivative[1:]
+        self._a = y0.copy()
+        self._b = m0
+        self._c = 3.0 * (y1 - y0) - 2.0 * m0 - m1
+        self._d = 2.0 * (y0 - y1) + m0 + m1
+        self.model = model
+        self.size = size
+        self.step = step
+        self._inverse_step = 1.0 / step
+
+    def evaluate(self, color_value):
+        """Interpolates the BC and its derivative from the table.
+
+        Args:
+            color_value: Array of colors, which must lie inside the valid
+                range of the model.
+
+        Returns:
+            A tuple of arrays containing the bolometric corrections and
+            their derivatives with respect to the color.
+
+            (bolometric_correction, derivative)
+        """
+        # Updated in place throughout to avoid temporaries.
+        s = np.subtract(color_value, self.model.range_min, dtype=float)
+        s *= self._inverse_step
+        index = s.astype(np.intp)
+        np.clip(index, 0, self.size - 2, out=index)
+        s -= index
+        b = np.take(self._b, index)
+        c = np.take(self._c, index)
+        d = np.take(self._d, index)
+
+        bolometric_correction = d * s
+        bolometric_correction += c
+        bolometric_correction *= s
+        bolometric_correction += b
+        bolometric_correction *= s
+        bolometric_correction += np.take(self._a, index)
+
+        derivative = d
+        derivative *= 3.0
+        derivative *= s
+        c *= 2.0
+        derivative += c
+        derivative *= s
+        derivative += b
+        derivative *= self._inverse_step
+
+        return bolometric_correction, derivative
+
+def get_table(color_type, size=DEFAULT_TABLE_SIZE):
+    """Returns the lookup table for a color, building it on first use.
+
+    Args:
+        color_type: String signifying the color ("BminusV", "VminusI" or
+            "BminusI"), or a BCModel.
+        size: Number of grid points in the table.
+
+    Returns:
+        The BCTable for the color.
+    """
+    model = bc_polynomial.get_model(color_type)
+    key = (model, size)
+    table = _tables.get(key)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(key)
+            if table is None:
+                table = _tables[key] = BCTable(model, size)
+    return table
@@ -0,0 +1,131 @@
+"""Memory-mapped binary input and output for photometry catalogs.
+
+Catalogs are numpy structured arrays stored as .npy files (or as raw
+binary files of a known dtype), with one named field per column. They
+are opened with numpy.memmap, and each chunk handed to the batch
+kernels is a view of the mapped fields, so no column is parsed or
+copied up front. Results are written into a memory-mapped .npy file
+of RESULT_DTYPE, row for row with the input catalog. Only the current
+chunk and its results need to be resident in memory.
+"""
+from .luminosity_batch import (FIELDS, add_bolometric_correction, add_Fbol,
+                               add_Lbol)
+import numpy as np
+
+# Record layout of result files.
+RESULT_DTYPE = np.dtype([("bc", np.float64), ("bc_err", np.float64),
+                         ("Fbol", np.float64), ("Fbol_err", np.float64),
+                         ("Lbol", np.float64), ("Lbol_err", np.float64),
+                         ("valid", np.bool_)])
+
+def open_catalog(path, dtype=None):
+    """Memory-maps a catalog for reading.
+
+    Args:
+        path: Path to a .npy file holding a structured array, or to a raw
+            binary file of records.
+        dtype: Record dtype of a raw binary file. Leave as None for .npy
+            files, whose dtype is read from the header.
+
+    Returns:
+        A read-only memory-mapped structured array.
+    """
+    if dtype is None:
+        return np.load(path, mmap_mode="r")
+    return np.memmap(path, dtype=dtype, mode="r")
+
+def create_results(path, length):
+    """Creates a memory-mapped .npy file to hold results.
+
+    Args:
+        path: Path of the .npy file to create.
+        length: Number of rows.
+
+    Returns:
+        A writable memory-mapped array of RESULT_DTYPE.
+    """
+    return np.lib.format.open_memmap(path, mode="w+", dtype=RESULT_DTYPE,
+                                     shape=(length,))
+
+def read_chunks(catalog, columns, fixed, chunk_size):
+    """Splits a mapped catalog into chunks of column views.
+
+    Args:
+        catalog: Structured array, usually from open_catalog.
+        columns: dict mapping names of luminosity inputs (color_value,
+            color_err, color_type, v_magnitude, v_magnitude_err,
+            distance, distance_err) to catalog fields.
+        fixed: dict mapping input names to values which are used for
+            every row instead of being read from a field.
+        chunk_size: Maximum number of rows per chunk.
+
+    Yields:
+        dicts holding the "start" and "stop" rows of the chunk, and a
+        view (or fixed value) for each luminosity input.
+
+    Raises:
+        ValueError: A mapped field is not in the catalog.
+    """
+    names = catalog.dtype.names or ()
+    for field, column in columns.items():
+        if field not in fixed and column not in names:
+            raise ValueError("Column %r not found in input" % column)
+
+    for start in range(0, len(catalog), chunk_size):
+        stop = min(start + chunk_size, len(catalog))
+        rows = catalog[start:stop]
+        chunk = {"start": start, "stop": stop}
+        for field, column in columns.items():
+            if field in fixed:
+                chunk[field] = fixed[field]
+            elif rows.dtype[column].kind == "S":
+                chunk[field] = np.char.decode(rows[column], "ascii")
+            else:
+                chunk[field] = rows[column]
+        yield chunk
+
+def write_chunks(chunks, results):
+    """Writes the results of each chunk into a mapped result array.
+
+    Args:
+        chunks: Iterable of chunks holding the RESULT_DTYPE fields, plus
+            their "start" and "stop" rows.
+        results: Array of RESULT_DTYPE, usually from create_results.
+
+    Yields:
+        The number of rows written for each chunk.
+    """
+    for chunk in chunks:
+        rows = results[chunk["start"]:chunk["stop"]]
+        for name in RESULT_DTYPE.names:
+            rows[name] = chunk[name]
+        yield chunk["stop"] - chunk["start"]
+    if isinstance(results, np.memmap):
+        results.flush()
+
+def process_catalog(input_path, output_path, columns=None, fixed=None,
+                    chunk_size=1000000, dtype=None):
+    """Calculates bolometric luminosities for a whole binary catalog.
+
+    Args:
+        input_path: Path of the catalog (see open_catalog.)
+        output_path: Path of the .npy result file to create.
+        columns: dict mapping luminosity inputs to catalog fields. By
+            default each input is read from the field of the same name.
+        fixed: dict mapping luminosity inputs to values used for every
+            row, e.g. {"color_type": "BminusV", "distance": 1.54E23}.
+        chunk_size: Number of rows processed at a time.
+        dtype: Record dtype, for raw binary catalogs only.
+
+    Returns:
+        The number of rows processed.
+    """
+    fixed = dict(fixed or {})
+    mapping = dict((field, field) for field in FIELDS)
+    mapping.update(columns or {})
+
+    catalog = open_catalog(input_path, dtype)
+    results = create_results(output_path, len(catalog))
+    chunks = add_Lbol(add_Fbol(add_bolometric_correction(
+        read_chunks(catalog, mapping, fixed, chunk_size))))
+    return sum(write_chunks(chunks, results))
@@ -0,0 +1,239 @@
+"""A registry of bolometric correction calibrations.
+
+A calibration is a set of polynomial fits of BC against color, one per
+color type, each with its range of validity and rms error. The default
+calibration is that of Bersten & Hamuy (2009), built from the constants
+module. Others are loaded from JSON files of the form
+
+    {"name": "Example2020",
+     "reference": "Optional citation",
+     "colors": {"BminusV": {"coefficients": [-0.8, 5.0, -13.4],
+                            "range": [-0.2, 1.65],
+                            "rms_err": 0.11},
+                ...}}
+
+with coefficients lowest order first. Loaded files are cached, so each
+is only read once. Every fit is a BCModel, so it can be passed as the
+color_type of any of the bolometric correction and luminosity
+functions:
+
+    >>> model = load_calibration("example.json").get_model("BminusV")
+    >>> calc_Lbol_batch(colors, 0.04, model, v, 0.02, distance, 0.0)
+
+calc_bolometric_correction_calibrations evaluates several calibrations
+of one color at once. The colors are expanded into a single Vandermonde
+matrix, and multiplying it by the stacked coefficients of every
+calibration gives all the BCs in one matrix product.
+"""
+from . import bc_polynomial
+import json
+import os
+import threading
+import numpy as np
+
+DEFAULT_CALIBRATION = "BerstenHamuy2009"
+
+class Calibration(object):
+    """A named set of BC polynomial fits, one per color type.
+
+    Args:
+        name: Name the calibration is registered under.
+        models: dict mapping color types to BCModels.
+        reference: Optional citation for the calibration.
+    """
+
+    def __init__(self, name, models, reference=None):
+        self.name = name
+        self.models = dict(models)
+        self.reference = reference
+
+    def __repr__(self):
+        return "Calibration(%r, colors=%r)" % (self.name, self.colors())
+
+    def colors(self):
+        """Returns the sorted color types the calibration has fits for."""
+        return sorted(self.models)
+
+    def get_model(self, color_type):
+        """Returns the BCModel for a color type.
+
+        Raises:
+            ValueError: The calibration has no fit for the color.
+        """
+        try:
+            return self.models[color_type]
+        except KeyError:
+            raise ValueError("Calibration %r has no fit for %r"
+                             % (self.name, color_type))
+
+    def to_dict(self):
+        """Returns the calibration in the layout of a calibration file."""
+        colors = dict((color_type, {"coefficients": list(model.coefficients),
+                                    "range": [model.range_min,
+                                              model.range_max],
+                                    "rms_err": model.rms_err})
+                      for color_type, model in self.models.items())
+        data = {"name": self.name, "colors": colors}
+        if self.reference is not None:
+            data["reference"] = self.reference
+        return data
+
+def calibration_from_dict(data):
+    """Builds a Calibration from the contents of a calibration file.
+
+    Raises:
+        ValueError: A required entry is missing or malformed.
+    """
+    try:
+        name = data["name"]
+        models = {}
+        for color_type, fit in data["colors"].items():
+            range_min, range_max = fit["range"]
+            models[color_type] = bc_polynomial.BCModel(
+                color_type, fit["coefficients"], float(range_min),
+                float(range_max), float(fit["rms_err"]))
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValueError("Malformed calibration: %s" % error)
+    if not models:
+        raise ValueError("Calibration %r has no fits" % name)
+    return Calibration(name, models, data.get("reference"))
+
+_registry = {DEFAULT_CALIBRATION: Calibration(
+    DEFAULT_CALIBRATION, bc_polynomial.MODELS,
+    "Bersten, M. C., & Hamuy, M. 2009, ApJ, 701, 200")}
+_loaded = {}
+_lock = threading.Lock()
+
+def _register(calibration, replace):
+    """Body of register_calibration. The caller must hold _lock."""
+    existing = _registry.get(calibration.name)
+    if existing is not None and existing is not calibration and not replace:
+        raise ValueError("A calibration named %r is already registered"
+                         % calibration.name)
+    _registry[calibration.name] = calibration
+
+def register_calibration(calibration, replace=False):
+    """Adds a calibration to the registry under its name.
+
+    Raises:
+        ValueError: Another calibration is registered under the name
+            and replace is False.
+    """
+    with _lock:
+        _register(calibration, replace)
+
+def load_calibration(path):
+    """Loads a calibration file and registers it.
+
+    Each file is only read until it has been loaded and registered;
+    later calls return the same Calibration.
+
+    Args:
+        path: Path of a JSON calibration file.
+
+    Returns:
+        The Calibration.
+
+    Raises:
+        ValueError: The file is malformed, or its name is already taken
+            by a different calibration.
+    """
+    key = os.path.realpath(path)
+    with _lock:
+        calibration = _loaded.get(key)
+    if calibration is not None:
+        return calibration
+
+    with open(path) as stream:
+        calibration = calibration_from_dict(json.load(stream))
+    with _lock:
+        # Another thread may have loaded the file meanwhile.
+        if key not in _loaded:
+            _register(calibration, False)
+            _loaded[key] = calibration
+        return _loaded[key]
+
+def save_calibration(calibration, path):
+    """Writes a calibration to a JSON file readable by load_calibration."""
+    with open(path, "w") as stream:
+        json.dump(calibration.to_dict(), stream, indent=2, sort_keys=True)
+
+def get_calibration(name=DEFAULT_CALIBRATION):
+    """Returns a registered calibration by name.
+
+    Raises:
+        ValueError: No calibration is registered under the name.
+    """
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError("No calibration named %r is registered" % name)
+
+def calibration_names():
+    """Returns the sorted names of the registered calibrations."""
+    with _lock:
+        return sorted(_registry)
+
+def calc_bolometric_correction_calibrations(color_value, color_err,
+                                            color_type, calibrations=None):
+    """Calculates bolometric corrections under several calibrations.
+
+    Args:
+        color_value: Array of colors of the supernova in magnitudes
+            (corrected for reddening and extinction from the host and
+            MWG.)
+        color_err: Array of uncertainties in the photometric colors.
+        color_type: String signifying which color color_value
+            represents, e.g. "BminusV".
+        calibrations: Sequence of Calibrations or registered names. All
+            registered calibrations with a fit for the color by default.
+
+    Returns:
+        A tuple of numpy arrays of shape (calibrations,) + the broadcast
+        shape of the inputs, containing the bolometric corrections, their
+        uncertainties, and a boolean mask which is True where the color
+        is inside the valid range of that calibration's fit. BCs and
+        uncertainties are NaN where the mask is False, and a list of the
+        calibration names for the rows.
+
+        (bolometric_correction, uncertainty, valid, names)
+
+    Raises:
+        ValueError: A calibration is not registered or has no fit for
+            the color.
+    """
+    if calibrations is None:
+        calibrations = [get_calibration(name) for name in calibration_names()
+                        if color_type in get_calibration(name).models]
+    calibrations = [calibration if isinstance(calibration, Calibration)
+                    else get_calibration(calibration)
+                    for calibration in calibrations]
+    models = [calibration.get_model(color_type)
+              for calibration in calibrations]
+    coefficients, range_min, range_max, rms_err = \
+        bc_polynomial._stack_models(models)
+    terms = coefficients.shape[1]
+
+    color_value, color_err = np.broadcast_arrays(
+        np.asarray(color_value, dtype=float),
+        np.asarray(color_err, dtype=float))
+    shape = color_value.shape
+    color = color_value.ravel()
+
+    valid = (range_min <= color) & (color <= range_max)
+    vandermonde = np.vander(np.where(np.isfinite(color), color, 0.0), terms,
+                            increasing=True)
+    derivative_coefficients = coefficients[:, 1:] * np.arange(1, terms)
+
+    bolometric_correction = coefficients @ vandermonde.T
+    polynomial_derivative = derivative_coefficients @ vandermonde[:, :-1].T
+    uncertainty = np.hypot(polynomial_derivative * color_err.ravel(),
+                           rms_err)
+
+    bolometric_correction[~valid] = np.nan
+    uncertainty[~valid] = np.nan
+    shape = (len(models),) + shape
+
+    return (bolometric_correction.reshape(shape), uncertainty.reshape(shape),
+            valid.reshape(shape), [calibration.name
+                                   for calibration in calibrations])
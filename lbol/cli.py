@@ -0,0 +1,278 @@
+"""Command line batch processor for photometry files.
+
+Photometry is streamed through a pipeline of generators, one chunk of
+rows at a time, so memory use does not grow with the size of the input:
+
+    parse -> bolometric correction -> Fbol -> Lbol -> write
+
+Text (CSV or whitespace separated) and binary .npy catalogs are
+supported. Binary catalogs are memory-mapped through the binary_io
+module instead of being parsed.
+
+Example:
+
+    python -m lbol photometry.csv -o luminosities.csv --color-type BminusV
+"""
+from .luminosity_batch import add_bolometric_correction, add_Fbol, add_Lbol
+from . import binary_io
+from . import luminosity_batch
+import numpy as np
+import argparse
+import contextlib
+import csv
+import itertools
+import sys
+import time
+
+# Inputs to the luminosity calculation, and the default column names
+# they are read from.
+FIELDS = luminosity_batch.FIELDS
+
+# Columns appended to every output row.
+RESULT_COLUMNS = ("bc", "bc_err", "Fbol", "Fbol_err", "Lbol", "Lbol_err")
+
+def _split_rows(stream, input_format):
+    """Splits a text stream into (line number, fields) pairs.
+
+    Blank lines are skipped. Line numbers count from 1.
+    """
+    if input_format == "csv":
+        reader = csv.reader(stream)
+        return ((reader.line_num, row) for row in reader if row)
+    return ((number, line.split()) for number, line in enumerate(stream, 1)
+            if line.strip())
+
+def _column_values(field, index, block, numbers):
+    """Returns one column of a block of rows as an array.
+
+    Raises:
+        ValueError: A row is too short to hold the column, or a numeric
+            column holds a value which is not a number. The message
+            gives the line number of the row.
+    """
+    values = []
+    for number, row in zip(numbers, block):
+        if index >= len(row):
+            raise ValueError("Line %d has %d fields, but the %r column is "
+                             "field %d" % (number, len(row), field,
+                                           index + 1))
+        values.append(row[index])
+    if field == "color_type":
+        return np.array(values)
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        for number, value in zip(numbers, values):
+            try:
+                float(value)
+            except ValueError:
+                raise ValueError("Line %d: %r value %r is not a number"
+                                 % (number, field, value))
+        raise
+
+def parse_chunks(stream, columns, fixed, chunk_size, input_format="csv"):
+    """Reads a photometry table in chunks of rows.
+
+    The first row of the table must be a header naming the columns. A
+    leading "#" on the header row is ignored.
+
+    Args:
+        stream: Text file object to read from.
+        columns: dict mapping each name in FIELDS to the input column it
+            is read from.
+        fixed: dict mapping names in FIELDS to values which are used for
+            every row instead of being read from a column.
+        chunk_size: Maximum number of rows per chunk.
+        input_format: "csv" for comma separated values, or "ascii" for
+            whitespace separated values.
+
+    Yields:
+        dicts holding the header, the raw rows of the chunk, and an
+        array (or fixed value) for each name in FIELDS.
+
+    Raises:
+        ValueError: A mapped column is not in the header, a row has too
+            few fields, or a numeric value is not a number.
+    """
+    rows = _split_rows(stream, input_format)
+    first = next(rows, None)
+    if first is None:
+        return
+    header = [name.lstrip("#").strip() for name in first[1]]
+    header = [name for name in header if name]
+
+    indices = {}
+    for field in FIELDS:
+        if field in fixed:
+            continue
+        try:
+            indices[field] = header.index(columns[field])
+        except ValueError:
+            raise ValueError("Column %r not found in input" % columns[field])
+
+    while True:
+        numbered = list(itertools.islice(rows, chunk_size))
+        if not numbered:
+            return
+        numbers, block = zip(*numbered)
+        block = list(block)
+
+        chunk = {"header": header, "rows": block}
+        for field in FIELDS:
+            if field in fixed:
+                chunk[field] = fixed[field]
+            else:
+                chunk[field] = _column_values(field, indices[field], block,
+                                              numbers)
+        yield chunk
+
+def write_chunks(chunks, stream, output_format="csv"):
+    """Writes each chunk as rows of text.
+
+    Every output row holds the input row followed by RESULT_COLUMNS.
+    Chunks read from binary catalogs carry no text rows, so only the
+    results are written for them. Epochs with colors outside the valid
+    range of the polynomial fit have "nan" results.
+
+    Args:
+        chunks: Iterable of chunks from add_Lbol.
+        stream: Text file object to write to.
+        output_format: "csv" for comma separated values, or "ascii" for
+            whitespace separated values.
+
+    Yields:
+        The number of rows written for each chunk.
+    """
+    if output_format == "csv":
+        write_row = csv.writer(stream).writerow
+    else:
+        write_row = lambda row: stream.write(" ".join(row) + "\n")
+
+    header_written = False
+    for chunk in chunks:
+        if not header_written:
+            write_row(list(chunk.get("header", ())) + list(RESULT_COLUMNS))
+            header_written = True
+
+        results = [["%.10g" % value for value in chunk[name].tolist()]
+                   for name in RESULT_COLUMNS]
+        rows = chunk.get("rows", [()] * len(results[0]))
+        for row, row_results in zip(rows, zip(*results)):
+            write_row(list(row) + list(row_results))
+        yield len(results[0])
+
+def _parse_mapping(pairs):
+    """Turns ["FIELD=VALUE", ...] into a dict, checking the field names."""
+    mapping = {}
+    for pair in pairs:
+        field, _, value = pair.partition("=")
+        if field not in FIELDS or not value:
+            raise ValueError("Bad column mapping %r" % pair)
+        mapping[field] = value
+    return mapping
+
+def build_parser():
+    """Builds the argument parser for the command line interface."""
+    parser = argparse.ArgumentParser(
+        prog="python -m lbol",
+        description="Calculate bolometric luminosities for a photometry "
+                    "table.")
+    parser.add_argument("input", help="input table, or - for stdin")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output table, or - for stdout (default)")
+    parser.add_argument("--input-format", choices=("csv", "ascii", "npy"),
+                        help="default: npy for .npy files, otherwise csv")
+    parser.add_argument("--output-format", choices=("csv", "ascii", "npy"),
+                        help="default: npy for .npy files, otherwise csv; "
+                             "npy output needs npy input")
+    parser.add_argument("--chunk-size", type=int, default=100000,
+                        help="rows processed at a time (default 100000)")
+    parser.add_argument("--column", action="append", default=[],
+                        metavar="FIELD=COLUMN",
+                        help="read FIELD from input COLUMN; fields are "
+                             + ", ".join(FIELDS))
+    parser.add_argument("--color-type",
+                        help="color type for every row, instead of a "
+                             "column")
+    parser.add_argument("--distance", type=float,
+                        help="distance in cm for every row, instead of a "
+                             "column")
+    parser.add_argument("--distance-err", type=float,
+                        help="distance uncertainty for every row, instead "
+                             "of a column")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="do not report throughput on stderr")
+    return parser
+
+def main(argv=None):
+    """Runs the command line interface.
+
+    Args:
+        argv: list of command line arguments, without the program name.
+            Defaults to sys.argv[1:].
+
+    Returns:
+        The exit status.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    columns = dict((field, field) for field in FIELDS)
+    try:
+        columns.update(_parse_mapping(args.column))
+    except ValueError as err:
+        parser.error(str(err))
+    fixed = {}
+    for field in ("color_type", "distance", "distance_err"):
+        if getattr(args, field) is not None:
+            fixed[field] = getattr(args, field)
+
+    input_format = args.input_format or (
+        "npy" if args.input.endswith(".npy") else "csv")
+    output_format = args.output_format or (
+        "npy" if args.output.endswith(".npy") else "csv")
+    if input_format == "npy" and args.input == "-":
+        parser.error("npy input must be a file")
+    if output_format == "npy" and (input_format != "npy" or
+                                   args.output == "-"):
+        parser.error("npy output needs npy input and an output file")
+
+    start = time.time()
+    total_rows = 0
+    try:
+        with contextlib.ExitStack() as files:
+            if input_format == "npy":
+                catalog = binary_io.open_catalog(args.input)
+                chunks = binary_io.read_chunks(catalog, columns, fixed,
+                                               args.chunk_size)
+            else:
+                infile = (sys.stdin if args.input == "-"
+                          else files.enter_context(open(args.input)))
+                chunks = parse_chunks(infile, columns, fixed,
+                                      args.chunk_size, input_format)
+
+            chunks = add_Lbol(add_Fbol(add_bolometric_correction(chunks)))
+
+            if output_format == "npy":
+                results = binary_io.create_results(args.output, len(catalog))
+                written = binary_io.write_chunks(chunks, results)
+            else:
+                outfile = (sys.stdout if args.output == "-"
+                           else files.enter_context(
+                               open(args.output, "w", newline="")))
+                written = write_chunks(chunks, outfile, output_format)
+
+            for rows in written:
+                total_rows += rows
+    except (OSError, ValueError) as err:
+        sys.stderr.write("error: %s\n" % err)
+        return 1
+
+    if not args.quiet:
+        elapsed = time.time() - start
+        sys.stderr.write("Processed %d rows in %.2f s (%.0f rows/s)\n"
+                         % (total_rows, elapsed,
+                            total_rows / elapsed if elapsed > 0 else 0.0))
+    return 0
@@ -0,0 +1,254 @@
+"""A persistent, content-addressed cache of batch results.
+
+Reprocessing the same photometry with the same constants gives the same
+luminosities, so results can be kept on disk between runs. Each entry
+is a .npz file named after a SHA-256 key of
+
+    - the function and its options (e.g. the BC method),
+    - the dtype, shape and bytes of every input array,
+    - the fit of every color type used (coefficients, validity range
+      and rms error), and
+    - a fingerprint of the calibration in the constants module (all
+      coeff_*, min_*, max_*, rms_err_* values and mbol_zeropoint),
+
+so editing the constants invalidates every entry without any explicit
+bookkeeping. Entries are written to a temporary file in the cache
+directory and moved into place with os.replace, so a reader never sees
+a partial file and several processes can share one directory. When the
+directory grows beyond max_bytes, the least recently used entries are
+deleted.
+
+Example:
+
+    >>> cache = DiskCache("~/.cache/lbol")
+    >>> Lbol, Lbol_err, valid = cache.calc_Lbol_batch(...)
+"""
+from .bc_batch import calc_bolometric_correction_batch
+from .luminosity_batch import calc_Lbol_batch
+from . import bc_polynomial
+from . import constants
+from collections import namedtuple
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zipfile
+import numpy as np
+
+# Bumped whenever the layout of entries or the calculation changes.
+CACHE_VERSION = 1
+
+_CONSTANT_PREFIXES = ("coeff_", "min_", "max_", "rms_err_")
+
+DiskCacheInfo = namedtuple("DiskCacheInfo", ["hits", "misses", "max_bytes",
+                                             "current_bytes", "entries"])
+
+def constants_fingerprint():
+    """Returns a SHA-256 hex digest of the calibration constants.
+
+    The constants are read when this is called, so any change to them
+    gives a new fingerprint.
+    """
+    values = dict((name, getattr(constants, name))
+                  for name in dir(constants)
+                  if name.startswith(_CONSTANT_PREFIXES) or
+                  name == "mbol_zeropoint")
+    encoded = json.dumps(values, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def _hash_array(digest, array):
+    """Hashes the dtype, shape and contents of an array.
+
+    The bytes of an object array are pointers, which differ between
+    equal arrays, so object arrays are hashed as float.
+    """
+    array = np.asarray(array)
+    if array.dtype == object:
+        array = array.astype(float)
+    array = np.ascontiguousarray(array)
+    digest.update(("%s%r" % (array.dtype.str, array.shape)).encode("utf-8"))
+    digest.update(array.tobytes())
+
+def _hash_color_type(digest, color_type):
+    """Hashes a color type along with the fits it refers to."""
+    if isinstance(color_type, (str, bc_polynomial.BCModel)):
+        names = [color_type]
+    else:
+        # Hashed as str, since object arrays (e.g. from pandas) hold
+        # pointers rather than the strings.
+        color_type = np.asarray(color_type).astype(str)
+        _hash_array(digest, color_type)
+        names = [str(name) for name in np.unique(color_type)]
+    for name in names:
+        model = bc_polynomial.get_model(name)
+        digest.update(repr((model.name, model.coefficients, model.range_min,
+                            model.range_max,
+                            model.rms_err)).encode("utf-8"))
+
+class DiskCache(object):
+    """A directory of cached batch results.
+
+    Safe to share between threads and between processes.
+
+    Args:
+        directory: Directory holding the entries. Created if missing.
+        max_bytes: Largest total size of the entries. The least recently
+            used entries are deleted when a new entry takes the total
+            over this size.
+    """
+
+    def __init__(self, directory, max_bytes=2**30):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def key(self, function_name, inputs, color_type, options):
+        """Returns the hex key of a calculation.
+
+        Args:
+            function_name: Name of the function calculated.
+            inputs: list of the numeric input arrays, in argument order.
+            color_type: The color type argument.
+            options: dict of the other arguments which affect results.
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps([CACHE_VERSION, function_name,
+                                  constants_fingerprint(), options],
+                                 sort_keys=True).encode("utf-8"))
+        for array in inputs:
+            _hash_array(digest, array)
+        _hash_color_type(digest, color_type)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key, names):
+        """Returns the arrays stored under a key, or None on a miss.
+
+        Args:
+            key: Key from the key method.
+            names: Names of the arrays to return, in order.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                arrays = tuple(entry[name] for name in names)
+            os.utime(path)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return arrays
+
+    def put(self, key, names, arrays):
+        """Stores arrays under a key, then evicts to stay under max_bytes.
+
+        Args:
+            key: Key from the key method.
+            names: Names of the arrays.
+            arrays: The arrays, in the same order as names.
+        """
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory,
+                                                 suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as stream:
+                np.savez(stream, **dict(zip(names, arrays)))
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def _entries(self):
+        """Returns (last use, size, path) for every entry, oldest first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        """Deletes least recently used entries until under max_bytes."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def info(self):
+        """Returns a DiskCacheInfo with hit and miss counts and size."""
+        entries = self._entries()
+        with self._lock:
+            return DiskCacheInfo(self._hits, self._misses, self.max_bytes,
+                                 sum(size for _, size, _ in entries),
+                                 len(entries))
+
+    def clear(self):
+        """Deletes every entry and resets the statistics."""
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+
+    def _cached(self, function, inputs, color_type, options, names):
+        key = self.key(function.__name__, inputs, color_type, options)
+        arrays = self.get(key, names)
+        if arrays is None:
+            arrays = function(*inputs[:2], color_type, *inputs[2:],
+                              **options)
+            self.put(key, names, arrays)
+        return arrays
+
+    def calc_bolometric_correction_batch(self, color_value, color_err,
+                                         color_type, method="polynomial"):
+        """Cached calc_bolometric_correction_batch.
+
+        Takes the same arguments and returns the same values as the
+        function in the bc_batch module.
+        """
+        return self._cached(calc_bolometric_correction_batch,
+                            [color_value, color_err], color_type,
+                            {"method": method},
+                            ("bolometric_correction", "uncertainty",
+                             "valid"))
+
+    def calc_Lbol_batch(self, color_value, color_err, color_type,
+                        v_magnitude, v_magnitude_err, distance, distance_err,
+                        method="polynomial"):
+        """Cached calc_Lbol_batch.
+
+        Takes the same arguments and returns the same values as the
+        function in the luminosity_batch module.
+        """
+        return self._cached(calc_Lbol_batch,
+                            [color_value, color_err, v_magnitude,
+                             v_magnitude_err, distance, distance_err],
+                            color_type, {"method": method},
+                            ("Lbol", "uncertainty", "valid"))
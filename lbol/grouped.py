@@ -0,0 +1,136 @@
+"""Luminosities for tables which mix epochs of many supernovae.
+
+Each row of the table is an epoch of one object, named by an object ID
+column, while the distance, distance uncertainty and color type are
+given once per object. The rows are matched to their objects once,
+with a single sort of the object IDs and a binary search of the row
+IDs, and everything else is gathered through that index:
+
+    - 4*pi*D^2 is calculated once per object and gathered to the rows,
+    - the bolometric corrections are calculated in one batch per color
+      type, over all the rows of every object using that color.
+
+The rows are never reordered, so the results line up with the input.
+"""
+from .bc_batch import calc_bolometric_correction_batch
+from . import instrumentation
+from . import luminosity_batch
+import numpy as np
+
+def object_index(object_id, objects):
+    """Finds the object of every row.
+
+    Args:
+        object_id: Array of the object ID of each row.
+        objects: Array of the distinct object IDs, in any order.
+
+    Returns:
+        An integer array giving, for each row, the position of its
+        object in objects.
+
+    Raises:
+        ValueError: objects holds an ID twice, or a row's ID is not in
+            objects.
+    """
+    object_id = np.asarray(object_id)
+    objects = np.asarray(objects)
+    if objects.ndim != 1:
+        raise ValueError("objects must be a 1-d array")
+    order = np.argsort(objects, kind="stable")
+    sorted_objects = objects[order]
+    if np.any(sorted_objects[1:] == sorted_objects[:-1]):
+        raise ValueError("The object IDs are not distinct")
+
+    positions = np.searchsorted(sorted_objects, object_id)
+    np.minimum(positions, max(len(objects) - 1, 0), out=positions)
+    found = (sorted_objects[positions] == object_id if len(objects)
+             else np.zeros(object_id.shape, dtype=bool))
+    if not np.all(found):
+        missing = object_id[~found].ravel()[0]
+        raise ValueError("Object %r is not in the object list" % (missing,))
+    return order[positions]
+
+@instrumentation.timed
+def calc_Lbol_grouped(object_id, color_value, color_err, v_magnitude,
+                      v_magnitude_err, objects, distance, distance_err,
+                      color_type, method="polynomial"):
+    """Calculates bolometric luminosities for a multi-object table.
+
+    Args:
+        object_id: Array of the object ID of each row.
+        color_value: Array of the colors of each row in magnitudes
+            (corrected for reddening and extinction from the host and
+            MWG.)
+        color_err: Array of uncertainties in the colors.
+        v_magnitude: Array of V band magnitudes, corrected for host + MWG
+            extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+        objects: Array of the distinct object IDs.
+        distance: Array of the distance to each object in centimeters,
+            in the order of objects.
+        distance_err: Array of the uncertainties in the distances.
+        color_type: The color type of each object ("BminusV", "VminusI"
+            or "BminusI"), in the order of objects, or a single color
+            type (or BCModel) for all of them.
+        method: How the bolometric corrections are evaluated, as in
+            calc_bolometric_correction_batch.
+
+    Returns:
+        A tuple of numpy arrays, in the row order of the input,
+        containing the bolometric luminosities in ergs per second, their
+        uncertainties, and a boolean mask which is True where the color
+        is inside the valid range of the polynomial fit. Luminosities
+        and uncertainties are NaN where the mask is False.
+
+        (Lbol, uncertainty, valid)
+
+    Raises:
+        ValueError: A row's object is not in objects, an array of color
+            types does not have the shape of objects, or a color type
+            is not valid.
+    """
+    index = object_index(object_id, objects)
+    color_value, color_err, v_magnitude, v_magnitude_err = \
+        np.broadcast_arrays(*[np.asarray(array, dtype=float)
+                              for array in (color_value, color_err,
+                                            v_magnitude, v_magnitude_err)])
+    if color_value.shape != index.shape:
+        raise ValueError("The row arrays must match the object_id column")
+
+    if isinstance(color_type, str) or not np.ndim(color_type):
+        bolometric_correction, bc_err, valid = \
+            calc_bolometric_correction_batch(color_value, color_err,
+                                             color_type, method=method)
+    else:
+        if np.shape(color_type) != np.shape(objects):
+            raise ValueError("color_type has shape %r, but objects has "
+                             "shape %r" % (np.shape(color_type),
+                                           np.shape(objects)))
+        names, object_codes = np.unique(np.asarray(color_type),
+                                        return_inverse=True)
+        row_codes = object_codes.reshape(-1)[index]
+        bolometric_correction = np.full(color_value.shape, np.nan)
+        bc_err = np.full(color_value.shape, np.nan)
+        valid = np.zeros(color_value.shape, dtype=bool)
+        for code, name in enumerate(names):
+            rows = row_codes == code
+            (bolometric_correction[rows], bc_err[rows], valid[rows]) = \
+                calc_bolometric_correction_batch(color_value[rows],
+                                                 color_err[rows], str(name),
+                                                 method=method)
+
+    Fbol, Fbol_err = luminosity_batch.calc_Fbol_from_bc(
+        bolometric_correction, bc_err, v_magnitude, v_magnitude_err)
+    shape = np.shape(objects)
+    fourPiDsquared, fourPiDsquared_err = \
+        luminosity_batch.calc_4piDsquared_batch(
+            np.broadcast_to(np.asarray(distance, dtype=float), shape),
+            np.broadcast_to(np.asarray(distance_err, dtype=float), shape))
+    fourPiDsquared = fourPiDsquared[index]
+    fourPiDsquared_err = fourPiDsquared_err[index]
+
+    Lbol = Fbol * fourPiDsquared
+    Lbol_uncertainty = np.hypot(fourPiDsquared * Fbol_err,
+                                Fbol * fourPiDsquared_err)
+
+    return Lbol, Lbol_uncertainty, valid
@@ -0,0 +1,248 @@
+"""Opt-in instrumentation of the luminosity calculation.
+
+Functions along the hot path are marked with the timed decorator.
+While instrumentation is switched on, every call to them adds to a
+per-stage call count and cumulative wall time, and every color found
+outside the valid range of its polynomial fit is counted against its
+color type.
+
+While it is off (the default) the marked functions are not wrapped at
+all, so they cost nothing extra. Switching it on swaps a timing wrapper
+in for each of them in the namespaces of the lbol modules, and
+switching it off swaps the plain functions back. References taken
+outside lbol while it was off (e.g. "from lbol.luminosity import
+calc_Lbol" in another module) keep calling the plain function, so use
+module attributes such as luminosity.calc_Lbol to have calls timed.
+
+Example:
+
+    >>> from lbol import instrumentation
+    >>> with instrumentation.instrument() as stats:
+    ...     calc_Lbol(...)
+    >>> print(stats.report())
+
+Instrumentation is process-wide. Each instrument() block collects into
+its own Stats every timed call made, by any thread, while the block is
+open, so the blocks may overlap and exit in any order; the wrappers
+stay in place until the last block exits and enable() is not in
+effect. Statistics are only collected in the current process, so work
+done in worker processes (the workers argument of the batch functions)
+is not included.
+"""
+from contextlib import contextmanager
+import functools
+import sys
+import threading
+import time
+import types
+
+# The Stats set by enable(), the Stats of each open instrument() block,
+# and all of them together, which the wrappers record into. Changed
+# only under _lock.
+_stats = None
+_blocks = []
+_collectors = ()
+_lock = threading.Lock()
+
+# The plain function of each timed stage and its timing wrapper.
+_wrappers = {}
+_plain_functions = {}
+_PACKAGE = __name__.rpartition(".")[0]
+
+class Stats(object):
+    """Call counts, timings and out-of-range rejections per stage.
+
+    Safe to update from multiple threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._rejections = {}
+
+    def record(self, stage, seconds):
+        """Adds one call taking the given time to a stage."""
+        with self._lock:
+            totals = self._stages.get(stage)
+            if totals is None:
+                totals = self._stages[stage] = [0, 0.0]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def record_rejections(self, color_type, count=1):
+        """Adds out-of-range colors to the count for a color type."""
+        with self._lock:
+            self._rejections[color_type] = \
+                self._rejections.get(color_type, 0) + count
+
+    def calls(self, stage):
+        """Returns the number of calls made to a stage."""
+        with self._lock:
+            return self._stages.get(stage, [0, 0.0])[0]
+
+    def total_time(self, stage):
+        """Returns the cumulative wall time spent in a stage, in seconds."""
+        with self._lock:
+            return self._stages.get(stage, [0, 0.0])[1]
+
+    def rejections(self, color_type=None):
+        """Returns the out-of-range count for a color type, or in total."""
+        with self._lock:
+            if color_type is None:
+                return sum(self._rejections.values())
+            return self._rejections.get(color_type, 0)
+
+    def snapshot(self):
+        """Returns a plain dict copy of the statistics.
+
+        Returns:
+            {"stages": {stage: {"calls": int, "seconds": float}},
+             "rejections": {color_type: int}}
+        """
+        with self._lock:
+            return {"stages": dict((stage, {"calls": calls,
+                                            "seconds": seconds})
+                                   for stage, (calls, seconds)
+                                   in self._stages.items()),
+                    "rejections": dict(self._rejections)}
+
+    def reset(self):
+        """Clears all the statistics."""
+        with self._lock:
+            self._stages.clear()
+            self._rejections.clear()
+
+    def report(self):
+        """Returns the statistics formatted as a table."""
+        snapshot = self.snapshot()
+        lines = ["%-40s %10s %12s" % ("stage", "calls", "seconds")]
+        for stage, totals in sorted(snapshot["stages"].items()):
+            lines.append("%-40s %10d %12.6f" % (stage, totals["calls"],
+                                                totals["seconds"]))
+        for color_type, count in sorted(snapshot["rejections"].items()):
+            lines.append("out of range %-27s %10d" % (color_type, count))
+        return "\n".join(lines)
+
+def _swap(replacements):
+    """Replaces functions in the namespaces of the package's modules.
+
+    Args:
+        replacements: dict mapping the functions to replace to their
+            replacements.
+    """
+    for name, module in list(sys.modules.items()):
+        if module is None or not (name == _PACKAGE or
+                                  name.startswith(_PACKAGE + ".")):
+            continue
+        namespace = vars(module)
+        for attribute, value in list(namespace.items()):
+            if isinstance(value, types.FunctionType):
+                replacement = replacements.get(value)
+                if replacement is not None:
+                    namespace[attribute] = replacement
+
+def _update():
+    """Recomputes the collectors and swaps the wrappers in or out.
+
+    The caller must hold _lock.
+    """
+    global _collectors
+    was_on = bool(_collectors)
+    _collectors = tuple(([_stats] if _stats is not None else []) + _blocks)
+    if _collectors and not was_on:
+        _swap(_wrappers)
+    elif was_on and not _collectors:
+        _swap(_plain_functions)
+
+def enable(stats=None):
+    """Switches instrumentation on until disable is called.
+
+    Args:
+        stats: Stats object to collect into, replacing any set by an
+            earlier call. A new one by default.
+
+    Returns:
+        The Stats object being collected into.
+    """
+    global _stats
+    with _lock:
+        _stats = stats if stats is not None else Stats()
+        _update()
+        return _stats
+
+def disable():
+    """Switches off the instrumentation switched on by enable.
+
+    Open instrument() blocks keep collecting.
+    """
+    global _stats
+    with _lock:
+        _stats = None
+        _update()
+
+def get_stats():
+    """Returns the Stats set by enable, or None."""
+    return _stats
+
+def enabled():
+    """Returns True if any Stats is being collected into."""
+    return bool(_collectors)
+
+@contextmanager
+def instrument(stats=None):
+    """Context manager which collects statistics inside its block.
+
+    Args:
+        stats: Stats object to collect into. A new one by default.
+
+    Yields:
+        The Stats object being collected into. It receives every timed
+        call made in the process while the block is open, including
+        calls inside nested or concurrent blocks.
+    """
+    current = stats if stats is not None else Stats()
+    with _lock:
+        _blocks.append(current)
+        _update()
+    try:
+        yield current
+    finally:
+        with _lock:
+            # Remove this block's entry, whatever the order of exits.
+            for index in range(len(_blocks) - 1, -1, -1):
+                if _blocks[index] is current:
+                    del _blocks[index]
+                    break
+            _update()
+
+def record_rejections(color_type, count=1):
+    """Counts out-of-range colors, if instrumentation is switched on."""
+    if count:
+        for stats in _collectors:
+            stats.record_rejections(color_type, count)
+
+def timed(function):
+    """Decorator which marks a function to be timed as a stage.
+
+    The stage is named after the function. The decorator returns the
+    plain function, or its timing wrapper if instrumentation is switched
+    on; switching it on and off swaps between the two afterwards.
+    """
+    stage = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        collectors = _collectors
+        if not collectors:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            for stats in collectors:
+                stats.record(stage, seconds)
+
+    _wrappers[function] = wrapper
+    _plain_functions[wrapper] = function
+    return wrapper if _collectors else function
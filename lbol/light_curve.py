@@ -0,0 +1,187 @@
+"""Bolometric light curves and their radiated energy.
+
+A LightCurve collects the epochs of one supernova in time order,
+calculates their bolometric fluxes in batch, and keeps a running
+trapezoidal integral of the flux. Appending epochs only touches the
+last epoch already in the integral, so each update costs O(1) per new
+epoch however long the light curve is.
+
+The integral is kept in flux (the fluence) and only multiplied by
+4*pi*D^2 when the energy is asked for. The flux uncertainties of
+different epochs are treated as independent. The distance uncertainty
+is the same for every epoch, so it is applied once to the whole
+integral rather than added in quadrature epoch by epoch.
+"""
+from . import bc_polynomial
+from .luminosity_batch import (calc_4piDsquared_batch, calc_Fbol_batch,
+                               calc_Lbol_from_Fbol)
+import numpy as np
+
+SECONDS_PER_DAY = 86400.0
+
+class LightCurve(object):
+    """The bolometric light curve of a single supernova.
+
+    Args:
+        color_type: String signifying which color the epochs are given
+            in ("BminusV", "VminusI" or "BminusI"), or a BCModel.
+        distance: The distance to the supernova in centimeters.
+        distance_err: The uncertainty in the distance.
+        time_scale: Seconds per unit of the epoch times. Times are in
+            days by default.
+    """
+
+    def __init__(self, color_type, distance, distance_err,
+                 time_scale=SECONDS_PER_DAY):
+        self.model = bc_polynomial.get_model(color_type)
+        self.distance = distance
+        self.distance_err = distance_err
+        self.time_scale = time_scale
+
+        self._chunks = []
+        self._arrays = None
+
+        self._fluence = 0.0
+        # Variance of the fluence from every valid epoch except the last,
+        # whose trapezoid weight still grows when the next one arrives.
+        self._settled_variance = 0.0
+        # (time, Fbol, Fbol_err, weight) of the last valid epoch.
+        self._last = None
+        self._last_time = None
+
+    def __len__(self):
+        return sum(len(chunk[0]) for chunk in self._chunks)
+
+    def append(self, time, color_value, color_err, v_magnitude,
+               v_magnitude_err):
+        """Adds one epoch to the end of the light curve.
+
+        Args:
+            time: Time of the epoch, not earlier than the last epoch.
+            color_value: Color of the supernova in magnitudes.
+            color_err: Uncertainty in the color.
+            v_magnitude: V band magnitude, corrected for extinction.
+            v_magnitude_err: Uncertainty in the V band magnitude.
+
+        Raises:
+            ValueError: The epoch is earlier than the last epoch.
+        """
+        self.extend([time], [color_value], [color_err], [v_magnitude],
+                    [v_magnitude_err])
+
+    def extend(self, times, color_values, color_errs, v_magnitudes,
+               v_magnitude_errs):
+        """Adds a batch of epochs to the end of the light curve.
+
+        Epochs whose color is outside the valid range of the polynomial
+        fit are kept (with NaN luminosities) but left out of the energy
+        integral, which then runs straight across them.
+
+        Args:
+            times: Array of epoch times, in increasing order and not
+                earlier than the last epoch.
+            color_values: Array of colors of the supernova in magnitudes.
+            color_errs: Array of uncertainties in the colors.
+            v_magnitudes: Array of V band magnitudes, corrected for
+                extinction.
+            v_magnitude_errs: Array of uncertainties in the V magnitudes.
+
+        Raises:
+            ValueError: The times are not in order.
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=float))
+        if times.size == 0:
+            return
+        if (np.any(np.diff(times) < 0) or
+                (self._last_time is not None and times[0] < self._last_time)):
+            raise ValueError("Epochs must be added in time order")
+
+        Fbol, Fbol_err, valid = [
+            np.broadcast_to(array, times.shape).copy()
+            for array in calc_Fbol_batch(color_values, color_errs,
+                                         self.model, v_magnitudes,
+                                         v_magnitude_errs)]
+
+        self._chunks.append((times, Fbol, Fbol_err, valid))
+        self._arrays = None
+        self._last_time = times[-1]
+        self._integrate(times[valid], Fbol[valid], Fbol_err[valid])
+
+    def _integrate(self, times, Fbol, Fbol_err):
+        """Adds valid epochs to the running trapezoidal integral."""
+        if times.size == 0:
+            return
+        previous_weight = 0.0
+        if self._last is not None:
+            last_time, last_Fbol, last_err, previous_weight = self._last
+            times = np.concatenate(([last_time], times))
+            Fbol = np.concatenate(([last_Fbol], Fbol))
+            Fbol_err = np.concatenate(([last_err], Fbol_err))
+
+        step = np.diff(times) * self.time_scale
+        self._fluence += np.sum(0.5 * step * (Fbol[:-1] + Fbol[1:]))
+
+        weight = np.zeros(times.shape)
+        weight[:-1] += 0.5 * step
+        weight[1:] += 0.5 * step
+        weight[0] += previous_weight
+
+        self._settled_variance += np.sum((weight[:-1] * Fbol_err[:-1])**2)
+        self._last = (times[-1], Fbol[-1], Fbol_err[-1], weight[-1])
+
+    def _epochs(self):
+        if self._arrays is None:
+            if self._chunks:
+                self._arrays = [np.concatenate(columns)
+                                for columns in zip(*self._chunks)]
+            else:
+                self._arrays = [np.zeros(0), np.zeros(0), np.zeros(0),
+                                np.zeros(0, dtype=bool)]
+        return self._arrays
+
+    def luminosities(self):
+        """Returns the bolometric luminosity of every epoch.
+
+        Returns:
+            A tuple of numpy arrays containing the epoch times, the
+            bolometric luminosities in ergs per second, their
+            uncertainties, and a mask which is True where the color was
+            inside the valid range of the polynomial fit.
+
+            (times, Lbol, uncertainty, valid)
+        """
+        times, Fbol, Fbol_err, valid = self._epochs()
+        Lbol, Lbol_err = calc_Lbol_from_Fbol(Fbol, Fbol_err, self.distance,
+                                             self.distance_err)
+        return times, Lbol, Lbol_err, valid
+
+    def fluence(self):
+        """Returns the time integral of the bolometric flux.
+
+        Returns:
+            A tuple containing the fluence and its uncertainty, in ergs
+            per square centimeter.
+
+            (fluence, uncertainty)
+        """
+        variance = self._settled_variance
+        if self._last is not None:
+            variance += (self._last[3] * self._last[2])**2
+        return float(self._fluence), float(np.sqrt(variance))
+
+    def energy(self):
+        """Returns the energy radiated between the first and last epochs.
+
+        Returns:
+            A tuple containing the radiated energy and its uncertainty,
+            in ergs.
+
+            (energy, uncertainty)
+        """
+        fluence, fluence_err = self.fluence()
+        fourPiDsquared, fourPiDsquared_err = calc_4piDsquared_batch(
+            self.distance, self.distance_err)
+        energy = fluence * fourPiDsquared
+        energy_uncertainty = np.hypot(fourPiDsquared * fluence_err,
+                                      fluence * fourPiDsquared_err)
+        return float(energy), float(energy_uncertainty)
@@ -1,8 +1,10 @@
-from bc_polynomial import calc_bolometric_correction as bc
-import bc_polynomial
-import constants
+from .bc_polynomial import calc_bolometric_correction as bc
+from . import bc_polynomial
+from . import constants
+from . import instrumentation
 import math
 
+@instrumentation.timed
 def calc_Fbol(color_value, color_err, color_type, v_magnitude,
               v_magnitude_err):
     """Calculates the bolometric flux of a Type II-P supernova.
@@ -15,6 +17,7 @@ def calc_Fbol(color_value, color_err, color_type, v_magnitude,
         color_type: String signifying which color color_value 
             represents. Valid values are "BminusV" for B-V, "VminusI"
             for V-I, and "BminusI" for B-I.
+            A BCModel may be given instead of a string.
         v_magnitude: Photometric magnitude in the V band, corrected for
             host + MWG extinction.
         v_magnitude_err: Uncertainty in the V band magnitude after 
@@ -43,6 +46,7 @@ def calc_Fbol(color_value, color_err, color_type, v_magnitude,
  
     return Fbol, Fbol_uncertainty
 
+@instrumentation.timed
 def calc_4piDsquared(distance, distance_err):
     """Calculates 4*pi*D^2, to convert flux to luminosity.
 
@@ -60,6 +64,7 @@ def calc_4piDsquared(distance, distance_err):
  
     return fourPiDsquared, fourPiDsquared_uncertainty
 
+@instrumentation.timed
 def calc_Lbol(color_value, color_err, color_type, v_magnitude,
                   v_magnitude_err, distance, distance_err):
     """Calculates the bolometric luminosity of a Type II-P Supernova.
@@ -72,6 +77,7 @@ def calc_Lbol(color_value, color_err, color_type, v_magnitude,
         color_type: String signifying which color color_value
             represents. Valid values are "BminusV" for B-V, "VminusI"
             for V-I, and "BminusI" for B-I.
+            A BCModel may be given instead of a string.
         v_magnitude: Photometric magnitude in the V band, corrected for
             host + MWG extinction.
         v_magnitude_err: Uncertainty in the V band magnitude after 
@@ -103,3 +109,52 @@ def calc_Lbol(color_value, color_err, color_type, v_magnitude,
                                                       Fbol * fourPiDsquared_err)
 
     return Lbol, Lbol_uncertainty
+
+@instrumentation.timed
+def calc_log_Lbol(color_value, color_err, color_type, v_magnitude,
+                  v_magnitude_err, distance, distance_err):
+    """Calculates the base-10 logarithm of the bolometric luminosity.
+
+    The logarithm is summed directly from the magnitudes and the
+    logarithm of the distance, so the luminosity itself is never formed.
+    The uncertainty is that of calc_Lbol, converted to dex.
+
+    Args:
+        color_value: B-V, V-I, or B-I color of the supernova in
+            magnitudes (corrected for reddening and extinction from
+            the host and MWG.)
+        color_err: Uncertainty in the photometric color.
+        color_type: String signifying which color color_value
+            represents. Valid values are "BminusV" for B-V, "VminusI"
+            for V-I, and "BminusI" for B-I.
+            A BCModel may be given instead of a string.
+        v_magnitude: Photometric magnitude in the V band, corrected for
+            host + MWG extinction.
+        v_magnitude_err: Uncertainty in the V band magnitude after
+            correction for host + MWG extinction.
+        distance: The distance to the supernova in centimeters.
+        distance_err: The uncertainty in the distance to the supernova.
+
+    Returns:
+        A tuple containing log10 of the bolometric luminosity in ergs
+        per second, and the uncertainty in that value in dex.
+
+        (log_Lbol, uncertainty)
+
+        (-999, -999) if the bolometric correction is -999 (which means
+        the observed color value is outside the range of validity of the
+        polynomial fit used to determine the bolometric correction.)
+    """
+    bolometric_correction, bc_err = bc(color_value, color_err, color_type)
+
+    if bolometric_correction == -999:
+        return -999, -999
+
+    log_Lbol = (-0.4 * (bolometric_correction + v_magnitude +
+                        constants.mbol_zeropoint) +
+                math.log10(4.0 * math.pi) + 2.0 * math.log10(distance))
+    log_Lbol_uncertainty = math.sqrt(
+        2.0 * 0.16 * (bc_err**2 + v_magnitude_err**2) +
+        (2.0 * distance_err / (distance * math.log(10)))**2)
+
+    return log_Lbol, log_Lbol_uncertainty
@@ -0,0 +1,411 @@
+from .bc_batch import (_check_options, calc_bolometric_correction_batch,
+                       calc_bolometric_correction_derivative_batch)
+from . import constants
+from . import instrumentation
+import numpy as np
+
+# Inputs of calc_Lbol_batch, in argument order.
+FIELDS = ("color_value", "color_err", "color_type", "v_magnitude",
+          "v_magnitude_err", "distance", "distance_err")
+
+@instrumentation.timed
+def calc_Fbol_batch(color_value, color_err, color_type, v_magnitude,
+                    v_magnitude_err, method="polynomial"):
+    """Calculates bolometric fluxes for arrays of epochs.
+
+    This is the array equivalent of calc_Fbol in the luminosity module.
+    All array arguments are broadcast against each other.
+
+    Args:
+        color_value: Array of B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from the
+            host and MWG.)
+        color_err: Array of uncertainties in the photometric colors.
+        color_type: String signifying which color color_value represents,
+            or an array of such strings (one per epoch). Valid values are
+            "BminusV" for B-V, "VminusI" for V-I, and "BminusI" for B-I.
+        v_magnitude: Array of photometric magnitudes in the V band,
+            corrected for host + MWG extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+        method: How the bolometric corrections are evaluated, as in
+            calc_bolometric_correction_batch.
+
+    Returns:
+        A tuple of numpy arrays containing the bolometric fluxes, their
+        uncertainties, and a boolean mask which is True where the color
+        is inside the valid range of the polynomial fit. Fluxes and
+        uncertainties are NaN where the mask is False.
+
+        (Fbol, uncertainty, valid)
+    """
+    color_value, color_err, v_magnitude, v_magnitude_err = \
+        np.broadcast_arrays(color_value, color_err, v_magnitude,
+                            v_magnitude_err)
+
+    bolometric_correction, bc_err, valid = \
+        calc_bolometric_correction_batch(color_value, color_err, color_type,
+                                         method=method)
+
+    Fbol, Fbol_uncertainty = calc_Fbol_from_bc(bolometric_correction,
+                                               bc_err, v_magnitude,
+                                               v_magnitude_err)
+
+    return Fbol, Fbol_uncertainty, valid
+
+def calc_Fbol_from_bc(bolometric_correction, bc_err, v_magnitude,
+                      v_magnitude_err):
+    """Calculates bolometric fluxes from precomputed BCs.
+
+    Args:
+        bolometric_correction: Array of bolometric corrections, as
+            returned by calc_bolometric_correction_batch.
+        bc_err: Array of uncertainties in the bolometric corrections.
+        v_magnitude: Array of photometric magnitudes in the V band,
+            corrected for host + MWG extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+
+    Returns:
+        A tuple of numpy arrays containing the bolometric fluxes and
+        their uncertainties.
+
+        (Fbol, uncertainty)
+    """
+    Fbol = 10**(-0.4 * (bolometric_correction + v_magnitude +
+                        constants.mbol_zeropoint))
+    Fbol_uncertainty = (np.sqrt(2) * 0.4 * np.log(10) * Fbol *
+                        np.hypot(bc_err, v_magnitude_err))
+
+    return Fbol, Fbol_uncertainty
+
+@instrumentation.timed
+def calc_4piDsquared_batch(distance, distance_err):
+    """Calculates 4*pi*D^2 for arrays of distances.
+
+    Args:
+        distance: Array of distances to the supernova.
+        distance_err: Array of uncertainties in the distances.
+
+    Returns:
+        A tuple of numpy arrays containing 4*pi*D^2, and the uncertainty
+        of this number.
+
+        (4piDsquared, uncertainty)
+    """
+    distance = np.asarray(distance, dtype=float)
+    distance_err = np.asarray(distance_err, dtype=float)
+
+    fourPiDsquared = 4.0 * np.pi * distance**2
+    fourPiDsquared_uncertainty = 8.0 * np.pi * distance * distance_err
+
+    return fourPiDsquared, fourPiDsquared_uncertainty
+
+@instrumentation.timed
+def calc_Lbol_batch(color_value, color_err, color_type, v_magnitude,
+                    v_magnitude_err, distance, distance_err, workers=None,
+                    method="polynomial", backend="process"):
+    """Calculates bolometric luminosities for arrays of epochs.
+
+    This is the array equivalent of calc_Lbol in the luminosity module.
+    All array arguments are broadcast against each other, so a single
+    distance can be given for a whole light curve.
+
+    Args:
+        color_value: Array of B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from the
+            host and MWG.)
+        color_err: Array of uncertainties in the photometric colors.
+        color_type: String signifying which color color_value represents,
+            or an array of such strings (one per epoch). Valid values are
+            "BminusV" for B-V, "VminusI" for V-I, and "BminusI" for B-I.
+        v_magnitude: Array of photometric magnitudes in the V band,
+            corrected for host + MWG extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+        distance: Array of distances to the supernova in centimeters.
+        distance_err: Array of uncertainties in the distances.
+        workers: Number of processes (or threads) to split the epochs
+            across. By default everything runs in the calling thread.
+        method: How the bolometric corrections are evaluated, as in
+            calc_bolometric_correction_batch.
+        backend: "process" or "thread", as in
+            calc_bolometric_correction_batch.
+
+    Returns:
+        A tuple of numpy arrays containing the bolometric luminosities
+        in ergs per second, their uncertainties, and a boolean mask which
+        is True where the color is inside the valid range of the
+        polynomial fit. Luminosities and uncertainties are NaN where the
+        mask is False.
+
+        (Lbol, uncertainty, valid)
+
+    Raises:
+        ValueError: A color type is not valid, or the method or backend
+            is not known.
+    """
+    _check_options(method, backend)
+    if workers is not None and workers > 1:
+        from . import parallel
+        return parallel.calc_Lbol_parallel(color_value, color_err,
+                                           color_type, v_magnitude,
+                                           v_magnitude_err, distance,
+                                           distance_err, workers,
+                                           method=method, backend=backend)
+
+    (color_value, color_err, v_magnitude, v_magnitude_err, distance,
+     distance_err) = np.broadcast_arrays(color_value, color_err, v_magnitude,
+                                         v_magnitude_err, distance,
+                                         distance_err)
+
+    Fbol, Fbol_err, valid = calc_Fbol_batch(color_value, color_err,
+                                            color_type, v_magnitude,
+                                            v_magnitude_err, method=method)
+    Lbol, Lbol_uncertainty = calc_Lbol_from_Fbol(Fbol, Fbol_err, distance,
+                                                 distance_err)
+
+    return Lbol, Lbol_uncertainty, valid
+
+@instrumentation.timed
+def calc_log_Lbol_batch(color_value, color_err, color_type, v_magnitude,
+                        v_magnitude_err, distance, distance_err,
+                        method="polynomial", dtype=np.float64):
+    """Calculates log10 of the bolometric luminosities for arrays of epochs.
+
+    This is the array equivalent of calc_log_Lbol in the luminosity
+    module. The logarithm is summed directly from the magnitudes and
+    log10 of the distance, so no quantity larger than ~100 is formed and
+    the calculation is safe in float32, where D^2 and Lbol overflow.
+
+    Args:
+        color_value: Array of B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from the
+            host and MWG.)
+        color_err: Array of uncertainties in the photometric colors.
+        color_type: String signifying which color color_value represents,
+            or an array of such strings (one per epoch).
+        v_magnitude: Array of photometric magnitudes in the V band,
+            corrected for host + MWG extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+        distance: Array of distances to the supernova in centimeters.
+        distance_err: Array of uncertainties in the distances.
+        method: How the bolometric corrections are evaluated, as in
+            calc_bolometric_correction_batch.
+        dtype: Floating point type the magnitudes and distances are
+            combined in, and of the returned arrays.
+
+    Returns:
+        A tuple of numpy arrays containing log10 of the bolometric
+        luminosities in ergs per second, their uncertainties in dex, and
+        a boolean mask which is True where the color is inside the valid
+        range of the polynomial fit. Both are NaN where the mask is
+        False.
+
+        (log_Lbol, uncertainty, valid)
+    """
+    dtype = np.dtype(dtype).type
+    (color_value, color_err, v_magnitude, v_magnitude_err, distance,
+     distance_err) = np.broadcast_arrays(color_value, color_err, v_magnitude,
+                                         v_magnitude_err, distance,
+                                         distance_err)
+
+    bolometric_correction, bc_err, valid = \
+        calc_bolometric_correction_batch(color_value, color_err, color_type,
+                                         method=method)
+    bolometric_correction = bolometric_correction.astype(dtype)
+    bc_err = bc_err.astype(dtype)
+    v_magnitude = np.asarray(v_magnitude, dtype=dtype)
+    v_magnitude_err = np.asarray(v_magnitude_err, dtype=dtype)
+    log_distance = np.log10(np.asarray(distance, dtype=dtype))
+    relative_distance_err = (np.asarray(distance_err, dtype=dtype) /
+                             np.asarray(distance, dtype=dtype))
+
+    log_Lbol = (dtype(-0.4) * (bolometric_correction + v_magnitude +
+                               dtype(constants.mbol_zeropoint)) +
+                dtype(np.log10(4.0 * np.pi)) + dtype(2.0) * log_distance)
+    log_Lbol_uncertainty = np.sqrt(
+        dtype(2.0 * 0.16) * (bc_err**2 + v_magnitude_err**2) +
+        (dtype(2.0 / np.log(10)) * relative_distance_err)**2)
+
+    return log_Lbol, log_Lbol_uncertainty, valid
+
+@instrumentation.timed
+def calc_Lbol_jacobian(color_value, color_err, color_type, v_magnitude,
+                       v_magnitude_err, distance, distance_err,
+                       covariance=None, method="polynomial"):
+    """Calculates bolometric luminosities and their analytic Jacobians.
+
+    For every epoch, the partial derivatives of Lbol with respect to the
+    color, the V magnitude and the distance are
+
+        dL/dc = -0.4 ln(10) L dBC/dc
+        dL/dV = -0.4 ln(10) L
+        dL/dD = 2 L / D
+
+    The uncertainty is propagated linearly through the Jacobian, plus
+    the rms error of the BC fit. Unlike calc_Lbol_batch, no factor of
+    sqrt(2) is applied to the magnitude terms, so the uncertainties are
+    smaller than those of calc_Lbol_batch for the same inputs.
+
+    Args:
+        color_value: Array of B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from the
+            host and MWG.)
+        color_err: Array of uncertainties in the photometric colors.
+        color_type: String signifying which color color_value represents,
+            or an array of such strings (one per epoch).
+        v_magnitude: Array of photometric magnitudes in the V band,
+            corrected for host + MWG extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+        distance: Array of distances to the supernova in centimeters.
+        distance_err: Array of uncertainties in the distances.
+        covariance: Optional covariance matrix of (color, V magnitude,
+            distance), either (3, 3) for every epoch or (epochs, 3, 3).
+            It replaces the diagonal covariance built from color_err,
+            v_magnitude_err and distance_err, e.g. to account for
+            correlated color and V errors.
+        method: How the bolometric corrections are evaluated, as in
+            calc_bolometric_correction_batch.
+
+    Returns:
+        A tuple of numpy arrays containing the bolometric luminosities in
+        ergs per second, the Jacobians (with a last axis of length 3 in
+        the order color, V magnitude, distance), the uncertainties in the
+        luminosities, and a boolean mask which is True where the color
+        is inside the valid range of the polynomial fit. Everything but
+        the mask is NaN where it is False.
+
+        (Lbol, jacobian, uncertainty, valid)
+    """
+    (color_value, color_err, v_magnitude, v_magnitude_err, distance,
+     distance_err) = np.broadcast_arrays(
+        *[np.asarray(array, dtype=float)
+          for array in (color_value, color_err, v_magnitude, v_magnitude_err,
+                        distance, distance_err)])
+
+    bolometric_correction, bc_derivative, rms_err, valid = \
+        calc_bolometric_correction_derivative_batch(color_value, color_type,
+                                                    method=method)
+
+    Lbol = (10**(-0.4 * (bolometric_correction + v_magnitude +
+                         constants.mbol_zeropoint)) *
+            4.0 * np.pi * distance**2)
+    dL_dV = -0.4 * np.log(10) * Lbol
+    jacobian = np.stack([dL_dV * bc_derivative, dL_dV,
+                         2.0 * Lbol / distance], axis=-1)
+
+    if covariance is None:
+        variance = (jacobian[..., 0] * color_err)**2 + \
+                   (jacobian[..., 1] * v_magnitude_err)**2 + \
+                   (jacobian[..., 2] * distance_err)**2
+    else:
+        covariance = np.asarray(covariance, dtype=float)
+        if covariance.shape[-2:] != (3, 3):
+            raise ValueError("covariance must have shape (3, 3) or "
+                             "(epochs, 3, 3)")
+        variance = np.einsum("...i,...ij,...j->...", jacobian, covariance,
+                             jacobian)
+    Lbol_uncertainty = np.sqrt(variance + (dL_dV * rms_err)**2)
+
+    return Lbol, jacobian, Lbol_uncertainty, valid
+
+@instrumentation.timed
+def calc_Lbol_distance_sweep(color_value, color_err, color_type, v_magnitude,
+                             v_magnitude_err, distances, distance_errs,
+                             method="polynomial"):
+    """Calculates bolometric luminosities over a grid of distances.
+
+    The bolometric flux of each epoch is calculated once, and then
+    scaled by 4*pi*D^2 for every candidate distance, so the cost of the
+    bolometric correction does not grow with the number of distances.
+
+    Args:
+        color_value: Array of B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from the
+            host and MWG.)
+        color_err: Array of uncertainties in the photometric colors.
+        color_type: String signifying which color color_value represents,
+            or an array of such strings (one per epoch).
+        v_magnitude: Array of photometric magnitudes in the V band,
+            corrected for host + MWG extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+        distances: 1-d array of candidate distances in centimeters.
+        distance_errs: Uncertainties in the candidate distances, either
+            one per distance or a single value for all of them.
+        method: How the bolometric corrections are evaluated, as in
+            calc_bolometric_correction_batch.
+
+    Returns:
+        A tuple containing arrays of shape (epochs, distances) with the
+        bolometric luminosities in ergs per second and their
+        uncertainties, and the boolean validity mask of the epochs.
+        Luminosities are NaN for invalid epochs.
+
+        (Lbol, uncertainty, valid)
+    """
+    distances, distance_errs = np.broadcast_arrays(
+        np.asarray(distances, dtype=float),
+        np.asarray(distance_errs, dtype=float))
+    if distances.ndim != 1:
+        raise ValueError("distances must be a 1-d array")
+
+    Fbol, Fbol_err, valid = calc_Fbol_batch(color_value, color_err,
+                                            color_type, v_magnitude,
+                                            v_magnitude_err, method=method)
+    Lbol, Lbol_uncertainty = calc_Lbol_from_Fbol(
+        Fbol[..., np.newaxis], Fbol_err[..., np.newaxis], distances,
+        distance_errs)
+
+    return Lbol, Lbol_uncertainty, valid
+
+def calc_Lbol_from_Fbol(Fbol, Fbol_err, distance, distance_err):
+    """Calculates bolometric luminosities from precomputed fluxes.
+
+    Args:
+        Fbol: Array of bolometric fluxes, as returned by calc_Fbol_batch.
+        Fbol_err: Array of uncertainties in the bolometric fluxes.
+        distance: Array of distances to the supernova in centimeters.
+        distance_err: Array of uncertainties in the distances.
+
+    Returns:
+        A tuple of numpy arrays containing the bolometric luminosities
+        in ergs per second and their uncertainties.
+
+        (Lbol, uncertainty)
+    """
+    fourPiDsquared, fourPiDsquared_err = calc_4piDsquared_batch(distance,
+                                                                distance_err)
+
+    Lbol = Fbol * fourPiDsquared
+    Lbol_uncertainty = np.hypot(fourPiDsquared * Fbol_err,
+                                Fbol * fourPiDsquared_err)
+
+    return Lbol, Lbol_uncertainty
+
+# Stages of a chunked pipeline, as used by the cli and binary_io modules.
+# Each takes an iterable of dicts holding arrays for the names in FIELDS
+# and adds its results to each dict.
+
+def add_bolometric_correction(chunks):
+    """Adds bolometric corrections to each chunk."""
+    for chunk in chunks:
+        chunk["bc"], chunk["bc_err"], chunk["valid"] = \
+            calc_bolometric_correction_batch(chunk["color_value"],
+                                             chunk["color_err"],
+                                             chunk["color_type"])
+        yield chunk
+
+def add_Fbol(chunks):
+    """Adds bolometric fluxes to each chunk."""
+    for chunk in chunks:
+        chunk["Fbol"], chunk["Fbol_err"] = \
+            calc_Fbol_from_bc(chunk["bc"], chunk["bc_err"],
+                              chunk["v_magnitude"],
+                              chunk["v_magnitude_err"])
+        yield chunk
+
+def add_Lbol(chunks):
+    """Adds bolometric luminosities to each chunk."""
+    for chunk in chunks:
+        chunk["Lbol"], chunk["Lbol_err"] = \
+            calc_Lbol_from_Fbol(chunk["Fbol"], chunk["Fbol_err"],
+                                chunk["distance"], chunk["distance_err"])
+        yield chunk
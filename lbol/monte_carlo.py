@@ -0,0 +1,118 @@
+"""Monte Carlo propagation of uncertainties through the luminosity chain.
+
+The analytic uncertainties from calc_bolometric_correction_err and
+calc_Fbol are first order, which is a poor approximation near the edges
+of the polynomial fits and for large distance uncertainties. Here the
+color, V magnitude and distance of every epoch are instead drawn from
+normal distributions, pushed through the full calculation, and the
+spread of the results is summarised by percentiles.
+
+Samples are processed in blocks of epochs, so that at most
+max_block_size samples are held in memory at once however large the
+number of epochs. All the samples of one epoch are in the same block,
+so n_samples may not be larger than max_block_size.
+"""
+from . import bc_polynomial
+from . import constants
+import numpy as np
+
+# Default percentiles: the median and the 1-sigma interval.
+DEFAULT_PERCENTILES = (15.865525393145708, 50.0, 84.13447460685429)
+
+def calc_Lbol_monte_carlo(color_value, color_err, color_type, v_magnitude,
+                          v_magnitude_err, distance, distance_err,
+                          n_samples=1000, rng=None,
+                          percentiles=DEFAULT_PERCENTILES,
+                          max_block_size=1000000):
+    """Calculates percentiles of the bolometric luminosity by sampling.
+
+    For each epoch, n_samples values of the color, V magnitude and
+    distance are drawn from normal distributions with the given means
+    and uncertainties. Each sample also gets a bolometric correction
+    offset drawn from the rms error of the polynomial fit. Samples whose
+    color falls outside the valid range of the fit are discarded.
+
+    The array arguments are broadcast against each other and flattened
+    into a one dimensional array of epochs.
+
+    Args:
+        color_value: Array of B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from the
+            host and MWG.)
+        color_err: Array of uncertainties in the photometric colors.
+        color_type: String signifying which color color_value
+            represents ("BminusV", "VminusI" or "BminusI"), or a BCModel.
+        v_magnitude: Array of photometric magnitudes in the V band,
+            corrected for host + MWG extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+        distance: Array of distances to the supernova in centimeters.
+        distance_err: Array of uncertainties in the distances.
+        n_samples: Number of samples drawn per epoch.
+        rng: numpy.random.Generator to draw samples from. Pass a seeded
+            generator for reproducible results.
+        percentiles: Sequence of percentiles (0-100) to return.
+        max_block_size: Maximum number of samples (epochs x n_samples)
+            held in memory at once.
+
+    Returns:
+        A tuple containing an array of shape (epochs, len(percentiles))
+        with the requested percentiles of the bolometric luminosity in
+        ergs per second, and an array with the fraction of samples of
+        each epoch which fell inside the valid color range. Percentiles
+        are NaN for epochs with no valid samples.
+
+        (percentiles, valid_fraction)
+
+    Raises:
+        ValueError: n_samples is less than 1 or larger than
+            max_block_size.
+    """
+    if not 1 <= n_samples <= max_block_size:
+        raise ValueError("n_samples must be between 1 and max_block_size "
+                         "(%d)" % max_block_size)
+    if rng is None:
+        rng = np.random.default_rng()
+    model = bc_polynomial.get_model(color_type)
+    percentiles = np.asarray(percentiles, dtype=float)
+
+    inputs = np.broadcast_arrays(*[np.atleast_1d(np.asarray(value,
+                                                            dtype=float))
+                                   for value in (color_value, color_err,
+                                                 v_magnitude,
+                                                 v_magnitude_err, distance,
+                                                 distance_err)])
+    inputs = [value.ravel() for value in inputs]
+    epochs = inputs[0].size
+
+    result = np.full((epochs, percentiles.size), np.nan)
+    valid_fraction = np.zeros(epochs)
+    block = max_block_size // n_samples
+
+    for start in range(0, epochs, block):
+        stop = min(start + block, epochs)
+        (color, color_sigma, v, v_sigma, dist, dist_sigma) = \
+            [value[start:stop, np.newaxis] for value in inputs]
+        size = (stop - start, n_samples)
+
+        color = color + color_sigma * rng.standard_normal(size)
+        valid = (model.range_min <= color) & (color <= model.range_max)
+        bolometric_correction = \
+            bc_polynomial.calculate_polynomial_and_derivative(
+                model.coefficients, np.where(valid, color, 0.0))[0]
+        bolometric_correction += model.rms_err * rng.standard_normal(size)
+
+        v = v + v_sigma * rng.standard_normal(size)
+        dist = dist + dist_sigma * rng.standard_normal(size)
+
+        Lbol = (10**(-0.4 * (bolometric_correction + v +
+                             constants.mbol_zeropoint)) *
+                4.0 * np.pi * dist**2)
+        Lbol[~valid] = np.nan
+
+        valid_fraction[start:stop] = valid.mean(axis=1)
+        has_samples = valid.any(axis=1)
+        if has_samples.any():
+            result[start:stop][has_samples] = np.nanpercentile(
+                Lbol[has_samples], percentiles, axis=1).T
+
+    return result, valid_fraction
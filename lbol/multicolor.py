@@ -0,0 +1,104 @@
+"""Combined bolometric corrections from several colors per epoch.
+
+When an epoch has B, V and I photometry, the B-V, V-I and B-I fits all
+give an estimate of the bolometric correction. Here every available
+color is evaluated in a single vectorized pass, by stacking the colors
+into a (colors x epochs) array and running Horner's method over a
+zero-padded matrix of coefficients. The estimates which fall inside the
+valid range of their fit are then combined with inverse-variance
+weights. The colors share photometry, so the estimates are not truly
+independent; the combined uncertainty treats them as if they were.
+"""
+from . import bc_polynomial
+from . import luminosity_batch
+import numpy as np
+
+def calc_bolometric_correction_combined(color_values, color_errs):
+    """Calculates an inverse-variance weighted BC from several colors.
+
+    Args:
+        color_values: dict mapping color types ("BminusV", "VminusI",
+            "BminusI") to arrays of colors, one per epoch. Use NaN for
+            epochs where a color was not measured.
+        color_errs: dict mapping the same color types to arrays of
+            uncertainties in the colors.
+
+    Returns:
+        A tuple of numpy arrays containing the combined bolometric
+        corrections, their uncertainties, and the number of colors which
+        were inside the valid range of their fit and so contributed to
+        each epoch. The BC and uncertainty are NaN for epochs where no
+        color was usable.
+
+        (bolometric_correction, uncertainty, n_colors)
+    """
+    names = sorted(color_values)
+    models = [bc_polynomial.get_model(name) for name in names]
+    coefficients, range_min, range_max, rms_err = \
+        bc_polynomial._stack_models(models)
+
+    shape = np.broadcast(*[np.asarray(values[name]) for name in names
+                           for values in (color_values, color_errs)]).shape
+    color = np.array([np.broadcast_to(np.asarray(color_values[name],
+                                                 dtype=float), shape).ravel()
+                      for name in names])
+    color_err = np.array([np.broadcast_to(np.asarray(color_errs[name],
+                                                     dtype=float),
+                                          shape).ravel()
+                          for name in names])
+
+    valid = (range_min <= color) & (color <= range_max)
+    color = np.where(valid, color, 0.0)
+
+    # Each term's (colors x 1) column of coefficients broadcasts against
+    # the (colors x epochs) colors.
+    polynomial, polynomial_derivative = \
+        bc_polynomial.calculate_polynomial_and_derivative(
+            coefficients.T[..., np.newaxis], color)
+
+    variance = (polynomial_derivative * color_err)**2 + rms_err**2
+    weight = np.where(valid, 1.0 / variance, 0.0)
+    total_weight = weight.sum(axis=0)
+    n_colors = valid.sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bolometric_correction = ((weight * polynomial).sum(axis=0) /
+                                 total_weight)
+        uncertainty = 1.0 / np.sqrt(total_weight)
+    bolometric_correction[n_colors == 0] = np.nan
+    uncertainty[n_colors == 0] = np.nan
+
+    return (bolometric_correction.reshape(shape), uncertainty.reshape(shape),
+            n_colors.reshape(shape))
+
+def calc_Lbol_combined(color_values, color_errs, v_magnitude,
+                       v_magnitude_err, distance, distance_err):
+    """Calculates bolometric luminosities using every available color.
+
+    Args:
+        color_values: dict mapping color types to arrays of colors, as
+            in calc_bolometric_correction_combined.
+        color_errs: dict mapping color types to arrays of uncertainties
+            in the colors.
+        v_magnitude: Array of photometric magnitudes in the V band,
+            corrected for host + MWG extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+        distance: Array of distances to the supernova in centimeters.
+        distance_err: Array of uncertainties in the distances.
+
+    Returns:
+        A tuple of numpy arrays containing the bolometric luminosities
+        in ergs per second, their uncertainties, and the number of colors
+        which contributed to each epoch. Luminosities are NaN for epochs
+        where no color was usable.
+
+        (Lbol, uncertainty, n_colors)
+    """
+    bolometric_correction, bc_err, n_colors = \
+        calc_bolometric_correction_combined(color_values, color_errs)
+    Fbol, Fbol_err = luminosity_batch.calc_Fbol_from_bc(
+        bolometric_correction, bc_err, v_magnitude, v_magnitude_err)
+    Lbol, Lbol_err = luminosity_batch.calc_Lbol_from_Fbol(
+        Fbol, Fbol_err, distance, distance_err)
+
+    return Lbol, Lbol_err, n_colors
@@ -0,0 +1,355 @@
+"""Parallel execution of the batch BC and luminosity calculations.
+
+There are two backends. With the "process" backend, inputs are copied
+once into memory-mapped buffers, and each worker process maps the same
+buffers and writes its results straight into its own slice of the
+output buffers. Nothing but the buffer paths and slice bounds is
+pickled. The buffers are kept on /dev/shm when it has room for all of
+them, and in the temporary directory otherwise; their space is
+reserved up front, so a full file system raises OSError rather than
+killing the process with SIGBUS. On POSIX systems the results are
+returned as views of the output buffers, whose files are unlinked once
+the workers are done, so on /dev/shm they hold shared memory until the
+arrays are freed. Elsewhere a mapped file cannot be deleted, so the
+results are copied out first.
+
+The "thread" backend is for hosts which cannot fork, such as threaded
+web servers. The epochs are split into chunks of CHUNK_SIZE, which a
+pool of threads in the calling process works through. Nearly all the
+time in a chunk is spent inside NumPy operations on whole arrays, which
+release the GIL, so the threads run on separate cores. Each chunk
+writes into its own slice of the outputs, and reads views of inputs
+which are contiguous arrays. A constant input, such as a scalar
+distance, is passed to every chunk as a scalar; any other broadcast
+input is copied one chunk at a time, never in full.
+
+Each backend keeps one pool for the life of the process, so workers
+are only started once. The pool grows to the largest number of workers
+asked for, and a call with fewer workers keeps that many busy.
+
+Because every shard or chunk owns a fixed slice, the output order does
+not depend on which worker finishes first.
+"""
+from concurrent.futures import (BrokenExecutor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from . import bc_batch
+from . import bc_polynomial
+from . import luminosity_batch
+import collections
+import numpy as np
+import os
+import shutil
+import tempfile
+import threading
+
+# Epochs per chunk for the thread backend. Large enough that the Python
+# overhead of a chunk (which holds the GIL) is small next to its NumPy
+# work, and small enough that the threads stay evenly loaded.
+CHUNK_SIZE = 65536
+
+class _SharedPool(object):
+    """An executor shared by every call, grown on demand.
+
+    Args:
+        factory: Function of the number of workers which creates an
+            executor.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.workers = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, workers, calls):
+        """Submits (function, args) calls to a pool of at least workers.
+
+        A smaller pool is replaced, and shut down once the calls already
+        submitted to it have finished. Submitting under the lock means a
+        pool is never shut down between being chosen and being used.
+
+        Returns:
+            The list of futures, in the order of calls.
+        """
+        with self._lock:
+            if self._executor is None or self.workers < workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = self.factory(workers)
+                self.workers = workers
+            return [self._executor.submit(function, *args)
+                    for function, args in calls]
+
+    def discard(self):
+        """Drops the pool, e.g. after one of its processes died."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self.workers = 0
+
+_thread_pool = _SharedPool(lambda workers: ThreadPoolExecutor(
+    max_workers=workers, thread_name_prefix="lbol"))
+_process_pool = _SharedPool(lambda workers: ProcessPoolExecutor(
+    max_workers=workers))
+
+def _bc_kernel(arrays, color_type, **options):
+    (arrays["bc"][...], arrays["bc_err"][...], arrays["valid"][...]) = \
+        bc_batch.calc_bolometric_correction_batch(arrays["color_value"],
+                                                  arrays["color_err"],
+                                                  color_type, **options)
+
+def _Lbol_kernel(arrays, color_type, **options):
+    (arrays["Lbol"][...], arrays["Lbol_err"][...], arrays["valid"][...]) = \
+        luminosity_batch.calc_Lbol_batch(arrays["color_value"],
+                                         arrays["color_err"], color_type,
+                                         arrays["v_magnitude"],
+                                         arrays["v_magnitude_err"],
+                                         arrays["distance"],
+                                         arrays["distance_err"],
+                                         **options)
+
+_KERNELS = {"bc": _bc_kernel, "Lbol": _Lbol_kernel}
+
+def _shared_directory(nbytes):
+    """Creates a scratch directory for nbytes of buffers.
+
+    The directory is on /dev/shm if it exists and has nbytes free, and
+    in the temporary directory otherwise.
+    """
+    if os.path.isdir("/dev/shm"):
+        status = os.statvfs("/dev/shm")
+        if status.f_bavail * status.f_frsize >= nbytes:
+            return tempfile.mkdtemp(prefix="lbol-", dir="/dev/shm")
+    return tempfile.mkdtemp(prefix="lbol-")
+
+def _create_buffer(path, dtype, length):
+    """Creates and maps a buffer file of length items.
+
+    Where the platform supports it, the file's blocks are allocated
+    before it is mapped, so running out of space raises OSError.
+    """
+    nbytes = max(length, 1) * np.dtype(dtype).itemsize
+    with open(path, "wb") as stream:
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(stream.fileno(), 0, nbytes)
+        else:
+            stream.truncate(nbytes)
+    return np.memmap(path, dtype=dtype, mode="r+",
+                     shape=(max(length, 1),))[:length]
+
+def _map_buffers(layout, start, stop):
+    """Maps the [start, stop) slice of every buffer in a layout."""
+    arrays = {}
+    for name, (path, dtype, length) in layout.items():
+        buffer = np.memmap(path, dtype=dtype, mode="r+", shape=(length,))
+        arrays[name] = buffer[start:stop]
+    return arrays
+
+def _process_shard(kernel, layout, start, stop, color_type, color_names,
+                   options):
+    """Runs a kernel over one shard. Executed in the worker processes."""
+    arrays = _map_buffers(layout, start, stop)
+    if color_names is not None:
+        color_type = np.asarray(color_names)[arrays["color_code"]]
+    _KERNELS[kernel](arrays, color_type, **options)
+
+def _shard_bounds(length, shards):
+    """Splits range(length) into contiguous, nearly equal [start, stop)."""
+    edges = np.linspace(0, length, shards + 1).astype(int)
+    return [(int(start), int(stop))
+            for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+def _broadcast_inputs(inputs, color_type):
+    """Broadcasts the input arrays and color type against each other.
+
+    Returns:
+        A tuple containing the list of input names, the list of their
+        broadcast arrays, the color type (broadcast to the same shape if
+        it is an array) and the broadcast shape.
+
+        (names, arrays, color_type, shape)
+    """
+    names = list(inputs)
+    broadcast = np.broadcast_arrays(*[np.asarray(inputs[name], dtype=float)
+                                      for name in names])
+    shape = broadcast[0].shape
+    if not isinstance(color_type, (str, bc_polynomial.BCModel)):
+        color_type = np.broadcast_to(np.asarray(color_type), shape)
+        shape = color_type.shape
+        broadcast = [np.broadcast_to(array, shape) for array in broadcast]
+    return names, broadcast, color_type, shape
+
+def _chunker(array):
+    """Returns a function of (start, stop) which slices a flat array.
+
+    The slices are of array as if flattened, without flattening it:
+    views of a contiguous array, the single value of an array whose
+    elements are all the same one (all strides 0), and otherwise a copy
+    of just the requested elements.
+    """
+    if array.flags.c_contiguous:
+        flat = array.reshape(-1)
+        return lambda start, stop: flat[start:stop]
+    if not any(array.strides):
+        value = array.reshape(-1)[:1][0] if array.size else array
+        return lambda start, stop: value
+    return lambda start, stop: array.flat[start:stop]
+
+def _run_threads(kernel, inputs, color_type, outputs, workers, options):
+    """Runs a kernel over broadcast inputs in a pool of threads.
+
+    Takes the same arguments and returns the same values as _run.
+    """
+    names, broadcast, color_type, shape = _broadcast_inputs(inputs,
+                                                           color_type)
+    length = int(np.prod(shape))
+    chunkers = dict((name, _chunker(array))
+                    for name, array in zip(names, broadcast))
+    if isinstance(color_type, np.ndarray):
+        for name in np.unique(color_type):
+            bc_polynomial.get_model(str(name))
+        color_chunker = _chunker(color_type)
+    else:
+        color_chunker = lambda start, stop: color_type
+    results = [np.empty(length, dtype=dtype) for _, dtype in outputs]
+
+    def process_chunk(start, stop):
+        arrays = dict((name, chunker(start, stop))
+                      for name, chunker in chunkers.items())
+        for (name, _), result in zip(outputs, results):
+            arrays[name] = result[start:stop]
+        _KERNELS[kernel](arrays, color_chunker(start, stop), **options)
+
+    # workers threads take chunks from a shared queue until it is empty,
+    # however many threads the shared pool has.
+    pending = collections.deque(_shard_bounds(
+        length, max(workers, -(-length // CHUNK_SIZE))))
+
+    def process_chunks():
+        while True:
+            try:
+                start, stop = pending.popleft()
+            except IndexError:
+                return
+            process_chunk(start, stop)
+
+    futures = _thread_pool.submit(
+        workers, [(process_chunks, ())] * min(workers, len(pending)))
+    for future in futures:
+        future.result()
+
+    return [result.reshape(shape) for result in results]
+
+def _run(kernel, inputs, color_type, outputs, workers, options):
+    """Runs a kernel over broadcast inputs in a pool of processes.
+
+    Args:
+        kernel: Name of the kernel in _KERNELS.
+        inputs: dict of input arrays, which are broadcast together.
+        color_type: Color type string or BCModel, or array of strings.
+        outputs: list of (name, dtype) pairs for the output arrays.
+        workers: Number of worker processes.
+        options: dict of keyword arguments passed on to the kernel.
+
+    Returns:
+        A list of output arrays, in the order given in outputs, with the
+        broadcast shape of the inputs.
+    """
+    names, broadcast, color_type, shape = _broadcast_inputs(inputs,
+                                                           color_type)
+    length = int(np.prod(shape))
+    itemsizes = ([np.dtype(float).itemsize] * len(names) +
+                 [np.dtype(dtype).itemsize for _, dtype in outputs])
+    if isinstance(color_type, np.ndarray):
+        itemsizes.append(np.dtype(np.intp).itemsize)
+
+    directory = _shared_directory(max(length, 1) * sum(itemsizes))
+    try:
+        layout = {}
+
+        def create(name, dtype):
+            path = os.path.join(directory, name)
+            layout[name] = (path, np.dtype(dtype).str, length)
+            return _create_buffer(path, dtype, length)
+
+        for name, array in zip(names, broadcast):
+            create(name, float)[...] = array.ravel()
+        color_names = None
+        if isinstance(color_type, np.ndarray):
+            color_names, codes = np.unique(color_type.ravel(),
+                                           return_inverse=True)
+            create("color_code", np.intp)[...] = codes.ravel()
+            color_names = color_names.tolist()
+            color_type = None
+            for name in color_names:
+                bc_polynomial.get_model(name)
+        results = [create(name, dtype) for name, dtype in outputs]
+
+        futures = _process_pool.submit(
+            workers, [(_process_shard, (kernel, layout, start, stop,
+                                        color_type, color_names, options))
+                      for start, stop in _shard_bounds(length, workers)])
+        try:
+            for future in futures:
+                future.result()
+        except BrokenExecutor:
+            _process_pool.discard()
+            raise
+
+        if os.name == "posix":
+            return [np.asarray(result).reshape(shape) for result in results]
+        return [np.array(result).reshape(shape) for result in results]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def _runner(backend):
+    """Returns the run function for a backend."""
+    bc_batch._check_options("polynomial", backend)
+    return _run if backend == "process" else _run_threads
+
+def calc_bolometric_correction_parallel(color_value, color_err, color_type,
+                                        workers, method="polynomial",
+                                        backend="process"):
+    """Calculates bolometric corrections in a pool of workers.
+
+    Takes the same arguments and returns the same values as
+    calc_bolometric_correction_batch in the bc_batch module.
+
+    Args:
+        workers: Number of worker processes or threads to split the
+            epochs across.
+        method: How the bolometric corrections are evaluated.
+        backend: "process" or "thread" (see the module docstring.)
+
+    Raises:
+        ValueError: The backend is not one of bc_batch.BACKENDS.
+    """
+    inputs = {"color_value": color_value, "color_err": color_err}
+    return _runner(backend)("bc", inputs, color_type,
+                            [("bc", float), ("bc_err", float),
+                             ("valid", bool)], workers, {"method": method})
+
+def calc_Lbol_parallel(color_value, color_err, color_type, v_magnitude,
+                       v_magnitude_err, distance, distance_err, workers,
+                       method="polynomial", backend="process"):
+    """Calculates bolometric luminosities in a pool of workers.
+
+    Takes the same arguments and returns the same values as
+    calc_Lbol_batch in the luminosity_batch module.
+
+    Args:
+        workers: Number of worker processes or threads to split the
+            epochs across.
+        method: How the bolometric corrections are evaluated.
+        backend: "process" or "thread" (see the module docstring.)
+
+    Raises:
+        ValueError: The backend is not one of bc_batch.BACKENDS.
+    """
+    inputs = {"color_value": color_value, "color_err": color_err,
+              "v_magnitude": v_magnitude, "v_magnitude_err": v_magnitude_err,
+              "distance": distance, "distance_err": distance_err}
+    return _runner(backend)("Lbol", inputs, color_type,
+                            [("Lbol", float), ("Lbol_err", float),
+                             ("valid", bool)], workers, {"method": method})
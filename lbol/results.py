@@ -0,0 +1,203 @@
+"""Compact columnar results for very large batches.
+
+An LbolResult holds the luminosities of a batch as four contiguous
+arrays: Lbol, Lbol_err, valid, and an int8 reason code per epoch
+saying why an epoch is invalid. The luminosities are float64 or
+float32. float32 halves the memory of the two largest columns, but its
+largest value is about 3.4E38, so luminosities are then stored in units
+of 1E40 ergs per second (see the unit attribute).
+
+calc_Lbol_result evaluates the BC, Fbol and Lbol chain in place in the
+result arrays, using the out and where arguments of the NumPy ufuncs.
+Given a preallocated result through out, repeated runs allocate
+nothing which grows with the batch, apart from the per-color selection
+masks of mixed color types and temporaries for array distances.
+"""
+from . import bc_batch
+from . import bc_polynomial
+from . import constants
+import numpy as np
+
+# Reason codes.
+OK = 0
+BELOW_RANGE = 1
+ABOVE_RANGE = 2
+NONFINITE = 3
+
+REASONS = ("ok", "below_range", "above_range", "nonfinite")
+
+DTYPES = (np.float32, np.float64)
+
+# Ergs per second represented by 1.0 in the Lbol and Lbol_err columns.
+DEFAULT_UNITS = {np.float64: 1.0, np.float32: 1E40}
+
+class LbolResult(object):
+    """Bolometric luminosities of a batch, stored as columns.
+
+    Attributes:
+        Lbol: Array of bolometric luminosities, in units of unit ergs
+            per second. NaN where valid is False.
+        Lbol_err: Array of uncertainties in the luminosities.
+        valid: Boolean array, True where the color is inside the valid
+            range of the polynomial fit.
+        reason: int8 array of reason codes: OK, BELOW_RANGE or
+            ABOVE_RANGE for colors below or above the valid range, or
+            NONFINITE for NaN or infinite colors.
+        unit: Ergs per second represented by 1.0 in Lbol and Lbol_err.
+    """
+    __slots__ = ("Lbol", "Lbol_err", "valid", "reason", "unit")
+
+    def __init__(self, Lbol, Lbol_err, valid, reason, unit=None):
+        if Lbol.dtype.type not in DTYPES or Lbol_err.dtype != Lbol.dtype:
+            raise ValueError("Lbol and Lbol_err must both be float32 or "
+                             "float64")
+        if not (Lbol.shape == Lbol_err.shape == valid.shape ==
+                reason.shape):
+            raise ValueError("The columns must all have the same shape")
+        if valid.dtype != np.bool_ or reason.dtype != np.int8:
+            raise ValueError("valid must be bool and reason int8")
+        self.Lbol = Lbol
+        self.Lbol_err = Lbol_err
+        self.valid = valid
+        self.reason = reason
+        self.unit = DEFAULT_UNITS[Lbol.dtype.type] if unit is None else unit
+
+    @classmethod
+    def empty(cls, shape, dtype=np.float64, unit=None):
+        """Allocates an uninitialized result, e.g. to pass as out."""
+        dtype = np.dtype(dtype)
+        if dtype.type not in DTYPES:
+            raise ValueError("dtype must be float32 or float64")
+        return cls(np.empty(shape, dtype), np.empty(shape, dtype),
+                   np.empty(shape, np.bool_), np.empty(shape, np.int8),
+                   unit)
+
+    def __len__(self):
+        return len(self.Lbol)
+
+    def __repr__(self):
+        return "LbolResult(shape=%r, dtype=%s, unit=%g)" % (
+            self.shape, self.dtype, self.unit)
+
+    @property
+    def shape(self):
+        return self.Lbol.shape
+
+    @property
+    def dtype(self):
+        return self.Lbol.dtype
+
+    @property
+    def nbytes(self):
+        """Total size of the four columns in bytes."""
+        return (self.Lbol.nbytes + self.Lbol_err.nbytes + self.valid.nbytes +
+                self.reason.nbytes)
+
+    def counts(self):
+        """Returns a dict mapping each name in REASONS to its count."""
+        counts = np.bincount(self.reason.ravel(), minlength=len(REASONS))
+        return dict(zip(REASONS, counts.tolist()))
+
+def _evaluate_model(model, color_value, color_err, result, where):
+    """Sets the BC, BC uncertainty and reason codes of one color's epochs.
+
+    The BC is left in result.Lbol and its uncertainty in result.Lbol_err.
+    result.valid is used as scratch space.
+    """
+    bc, bc_err, scratch, reason = (result.Lbol, result.Lbol_err,
+                                   result.valid, result.reason)
+    np.copyto(bc, 0.0, where=where)
+    np.copyto(bc_err, 0.0, where=where)
+    for coefficient in reversed(model.coefficients):
+        np.multiply(bc_err, color_value, out=bc_err, where=where)
+        np.add(bc_err, bc, out=bc_err, where=where)
+        np.multiply(bc, color_value, out=bc, where=where)
+        np.add(bc, coefficient, out=bc, where=where)
+    np.multiply(bc_err, color_err, out=bc_err, where=where)
+    np.hypot(bc_err, model.rms_err, out=bc_err, where=where)
+
+    np.copyto(reason, OK, where=where)
+    for code, compare, limit in ((BELOW_RANGE, np.less, model.range_min),
+                                 (ABOVE_RANGE, np.greater, model.range_max)):
+        compare(color_value, limit, out=scratch)
+        if where is not True:
+            np.logical_and(scratch, where, out=scratch)
+        np.copyto(reason, code, where=scratch)
+    np.isfinite(color_value, out=scratch)
+    np.logical_not(scratch, out=scratch)
+    if where is not True:
+        np.logical_and(scratch, where, out=scratch)
+    np.copyto(reason, NONFINITE, where=scratch)
+
+def calc_Lbol_result(color_value, color_err, color_type, v_magnitude,
+                     v_magnitude_err, distance, distance_err,
+                     dtype=np.float64, out=None):
+    """Calculates bolometric luminosities into an LbolResult.
+
+    Gives the same luminosities and uncertainties as calc_Lbol_batch in
+    the luminosity_batch module, up to the precision of dtype.
+
+    Args:
+        color_value: Array of B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from the
+            host and MWG.)
+        color_err: Array of uncertainties in the photometric colors.
+        color_type: String signifying which color color_value represents,
+            a BCModel, or an array of strings (one per epoch).
+        v_magnitude: Array of photometric magnitudes in the V band,
+            corrected for host + MWG extinction.
+        v_magnitude_err: Array of uncertainties in the V band magnitudes.
+        distance: Array of distances to the supernova in centimeters.
+        distance_err: Array of uncertainties in the distances.
+        dtype: np.float32 or np.float64, for the Lbol and Lbol_err
+            columns. Ignored if out is given.
+        out: Optional LbolResult with the broadcast shape of the inputs,
+            which is overwritten and returned.
+
+    Returns:
+        The LbolResult.
+
+    Raises:
+        ValueError: out does not have the broadcast shape of the inputs.
+    """
+    shape = np.broadcast_shapes(*[np.shape(array) for array in
+                                  (color_value, color_err, v_magnitude,
+                                   v_magnitude_err, distance, distance_err)])
+    if out is None:
+        out = LbolResult.empty(shape, dtype)
+    elif out.shape != shape:
+        raise ValueError("out has shape %r, but the inputs broadcast to %r"
+                         % (out.shape, shape))
+    Lbol, Lbol_err, valid = out.Lbol, out.Lbol_err, out.valid
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        if isinstance(color_type, (str, bc_polynomial.BCModel)):
+            _evaluate_model(bc_polynomial.get_model(color_type), color_value,
+                            color_err, out, True)
+        else:
+            for model, selection in bc_batch._color_groups(color_type,
+                                                           shape):
+                _evaluate_model(model, color_value, color_err, out,
+                                selection)
+
+        # Lbol = 10**(-0.4 (BC + V + zeropoint)) 4 pi D^2 / unit, summed in
+        # log space so that float32 never overflows on the way.
+        np.add(Lbol, v_magnitude, out=Lbol)
+        np.multiply(Lbol, -0.4 * np.log(10), out=Lbol)
+        np.add(Lbol, -0.4 * np.log(10) * constants.mbol_zeropoint +
+               np.log(4.0 * np.pi / out.unit), out=Lbol)
+        np.add(Lbol, 2.0 * np.log(distance), out=Lbol)
+        np.exp(Lbol, out=Lbol)
+
+        np.hypot(Lbol_err, v_magnitude_err, out=Lbol_err)
+        np.multiply(Lbol_err, np.sqrt(2) * 0.4 * np.log(10), out=Lbol_err)
+        np.hypot(Lbol_err, 2.0 * np.divide(distance_err, distance),
+                 out=Lbol_err)
+        np.multiply(Lbol_err, Lbol, out=Lbol_err)
+
+    np.not_equal(out.reason, OK, out=valid)
+    np.copyto(Lbol, np.nan, where=valid)
+    np.copyto(Lbol_err, np.nan, where=valid)
+    np.logical_not(valid, out=valid)
+
+    return out
@@ -0,0 +1,370 @@
+"""A local HTTP service for bolometric corrections and luminosities.
+
+Pipelines which calculate luminosities one epoch at a time can send
+them to a long-running service instead of importing lbol in every
+process. Concurrent requests are coalesced into micro-batches: a batch
+is calculated with the vectorized kernels as soon as it holds
+max_batch_size requests, or max_latency seconds after its first request
+arrived, whichever comes first.
+
+Endpoints (JSON in and out):
+
+    POST /bc       {"color_value", "color_err", "color_type"}
+                   -> {"bc", "bc_err", "valid"}
+    POST /lbol     {every name in luminosity_batch.FIELDS}
+                   -> {"Lbol", "Lbol_err", "valid"}
+    GET  /metrics  request and batch counts, p50/p99 latency in seconds
+                   and throughput in requests per second
+
+Values are null where valid is false. The service binds to localhost
+by default.
+
+Example:
+
+    python -m lbol.service --port 8000 --max-latency 0.002
+"""
+from .bc_batch import calc_bolometric_correction_batch
+from .luminosity_batch import FIELDS
+from .streaming import _check_record, calculate_records
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import collections
+import json
+import math
+import queue
+import sys
+import threading
+import time
+import numpy as np
+
+BC_FIELDS = ("color_value", "color_err", "color_type")
+
+_STOP = object()
+
+def calculate_bc_records(records):
+    """Calculates bolometric corrections for a list of records.
+
+    Args:
+        records: list of mappings, each holding a value for every name
+            in BC_FIELDS.
+
+    Returns:
+        A list with a (record, bc, uncertainty, valid) tuple for each
+        record.
+    """
+    columns = dict((field, np.array([record[field] for record in records]))
+                   for field in BC_FIELDS)
+    bc, bc_err, valid = calc_bolometric_correction_batch(**columns)
+    return list(zip(records, bc.tolist(), bc_err.tolist(), valid.tolist()))
+
+class Metrics(object):
+    """Thread-safe request latency and throughput statistics.
+
+    Args:
+        window: Number of most recent request latencies the percentiles
+            are calculated from.
+    """
+
+    def __init__(self, window=10000):
+        self._lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=window)
+        self._start = time.perf_counter()
+        self._requests = 0
+        self._batches = 0
+        self._batched_requests = 0
+
+    def record_request(self, seconds):
+        """Adds one answered request which took the given time."""
+        with self._lock:
+            self._requests += 1
+            self._latencies.append(seconds)
+
+    def record_batch(self, size):
+        """Adds one calculated batch of the given number of requests."""
+        with self._lock:
+            self._batches += 1
+            self._batched_requests += size
+
+    def snapshot(self):
+        """Returns the statistics as a plain dict."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            elapsed = time.perf_counter() - self._start
+            requests = self._requests
+            batches = self._batches
+            batched_requests = self._batched_requests
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            rank = int(math.ceil(fraction * len(latencies))) - 1
+            return latencies[max(rank, 0)]
+
+        return {"requests": requests,
+                "batches": batches,
+                "mean_batch_size": (batched_requests / batches
+                                    if batches else None),
+                "latency_p50": percentile(0.5),
+                "latency_p99": percentile(0.99),
+                "throughput": requests / elapsed if elapsed > 0 else None,
+                "uptime": elapsed}
+
+class MicroBatcher(object):
+    """Coalesces single requests into batches on a worker thread.
+
+    Args:
+        function: Called with a list of records, returning a list of
+            results in the same order.
+        max_batch_size: Largest number of records calculated together.
+        max_latency: Longest time in seconds a record waits for its
+            batch to fill up.
+        metrics: Optional Metrics to record batch sizes into.
+    """
+
+    def __init__(self, function, max_batch_size=1024, max_latency=0.005,
+                 metrics=None):
+        self.function = function
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.metrics = metrics
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        """Queues a record, returning a Future for its result."""
+        future = Future()
+        self._queue.put((record, future))
+        return future
+
+    def close(self):
+        """Calculates the records already queued and stops the thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        item = self._queue.get(timeout=timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._calculate(batch)
+
+    def _calculate(self, batch):
+        try:
+            results = self.function([record for record, _ in batch])
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        if self.metrics is not None:
+            self.metrics.record_batch(len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+def _parse_record(body, fields):
+    """Checks a request body and returns it as a record.
+
+    Raises:
+        ValueError: The body is not a JSON object holding a valid value
+            for every field.
+    """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise ValueError("Request body is not JSON")
+    if not isinstance(data, dict):
+        raise ValueError("Request body is not a JSON object")
+    return _check_record(data, fields)
+
+def _content_length(headers):
+    """Returns the Content-Length of a request, 0 if it has none.
+
+    Raises:
+        ValueError: The header is not a non-negative integer.
+    """
+    value = headers.get("Content-Length", "0")
+    try:
+        length = int(value)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise ValueError("Bad Content-Length %r" % value)
+    return length
+
+def _json_value(value):
+    """Replaces NaN with None, which is encoded as null."""
+    return None if value != value else value
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, self.server.service.metrics.snapshot())
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        service = self.server.service
+        endpoint = service.endpoints.get(self.path)
+        if endpoint is None:
+            self._send(404, {"error": "Not found"})
+            return
+        fields, names, batcher = endpoint
+
+        try:
+            length = _content_length(self.headers)
+            record = _parse_record(self.rfile.read(length), fields)
+        except ValueError as error:
+            self._send(400, {"error": str(error)})
+            return
+        try:
+            _, value, uncertainty, valid = batcher.submit(record).result()
+        except Exception as error:
+            self._send(500, {"error": str(error)})
+            return
+
+        self._send(200, {names[0]: _json_value(value),
+                         names[1]: _json_value(uncertainty),
+                         "valid": valid})
+        service.metrics.record_request(time.perf_counter() - start)
+
+    def _send(self, status, content):
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.service.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+class LbolService(object):
+    """An HTTP server answering BC and luminosity requests in batches.
+
+    Args:
+        host: Address to bind to.
+        port: Port to bind to. 0 picks a free port (see address.)
+        max_batch_size: Largest number of requests calculated together.
+        max_latency: Longest time in seconds a request waits for its
+            batch to fill up.
+        verbose: Log every request on stderr.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8000, max_batch_size=1024,
+                 max_latency=0.005, verbose=False):
+        self.metrics = Metrics()
+        self.verbose = verbose
+        self.endpoints = {
+            "/bc": (BC_FIELDS, ("bc", "bc_err"),
+                    MicroBatcher(calculate_bc_records, max_batch_size,
+                                 max_latency, self.metrics)),
+            "/lbol": (FIELDS, ("Lbol", "Lbol_err"),
+                      MicroBatcher(calculate_records, max_batch_size,
+                                   max_latency, self.metrics)),
+        }
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.service = self
+        self._thread = None
+
+    @property
+    def address(self):
+        """The (host, port) the server is bound to."""
+        return self.server.server_address[:2]
+
+    def serve_forever(self):
+        """Handles requests until shutdown is called from another thread."""
+        self.server.serve_forever()
+
+    def start(self):
+        """Handles requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Stops handling requests and closes the server."""
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
+        for _, _, batcher in self.endpoints.values():
+            batcher.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+def build_parser():
+    """Builds the argument parser for the service."""
+    parser = argparse.ArgumentParser(
+        prog="python -m lbol.service",
+        description="Serve bolometric corrections and luminosities over "
+                    "HTTP.")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to bind to (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000,
+                        help="port to bind to (default 8000)")
+    parser.add_argument("--max-batch-size", type=int, default=1024,
+                        help="largest batch of requests (default 1024)")
+    parser.add_argument("--max-latency", type=float, default=0.005,
+                        help="seconds a request waits for its batch to "
+                             "fill (default 0.005)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="log every request on stderr")
+    return parser
+
+def main(argv=None):
+    """Runs the service until interrupted.
+
+    Args:
+        argv: list of command line arguments, without the program name.
+            Defaults to sys.argv[1:].
+
+    Returns:
+        The exit status.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.max_batch_size < 1:
+        parser.error("--max-batch-size must be positive")
+    if args.max_latency < 0:
+        parser.error("--max-latency must not be negative")
+
+    service = LbolService(args.host, args.port, args.max_batch_size,
+                          args.max_latency, args.verbose)
+    sys.stderr.write("Serving on http://%s:%d\n" % service.address)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Asyncio streaming of bolometric luminosities.
+
+stream_Lbol consumes an async iterator of photometry records, such as
+a live alert stream, and gathers them into micro-batches. A batch is
+sent to the vectorized kernel as soon as it holds max_batch_size
+records, or max_latency seconds after its first record arrived,
+whichever comes first. Results are yielded one record at a time, in
+the order the records arrived.
+
+Each record is checked as it is taken from the queue. A record with a
+missing field, a value which is not a number or an unknown color type
+does not stop the stream: it is yielded in its place with NaN results,
+and reported to on_error if one is given.
+
+Records are read ahead into a bounded queue of max_pending records.
+When the consumer of the results falls behind, the queue fills and
+reading from the source pauses until there is room again.
+"""
+from .luminosity_batch import FIELDS, calc_Lbol_batch
+from . import bc_polynomial
+from collections.abc import Mapping
+import asyncio
+import numpy as np
+
+_END = object()
+
+class _Failure(object):
+    """Carries an exception raised by the source across the queue."""
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+async def _produce(records, queue):
+    """Copies records from the source into the queue."""
+    try:
+        async for record in records:
+            await queue.put(record)
+    except Exception as error:
+        await queue.put(_Failure(error))
+        return
+    await queue.put(_END)
+
+def _check_record(data, fields=FIELDS):
+    """Checks a mapping and returns it as a record.
+
+    Args:
+        data: Mapping holding a value for every name in fields.
+        fields: Names of the fields to copy into the record.
+
+    Returns:
+        A dict with the color_type field unchanged and every other field
+        converted to float.
+
+    Raises:
+        ValueError: data is not a mapping holding a valid value for
+            every field.
+    """
+    if not isinstance(data, Mapping):
+        raise ValueError("Record is not a mapping")
+    record = {}
+    for field in fields:
+        if field not in data:
+            raise ValueError("Missing field %r" % field)
+        if field == "color_type":
+            try:
+                bc_polynomial.get_model(data[field])
+            except TypeError as error:
+                raise ValueError(str(error))
+            record[field] = data[field]
+        else:
+            try:
+                record[field] = float(data[field])
+            except (TypeError, ValueError):
+                raise ValueError("Field %r is not a number" % field)
+    return record
+
+def calculate_records(records):
+    """Calculates bolometric luminosities for a list of records.
+
+    Args:
+        records: list of mappings, each holding a value for every name
+            in FIELDS (color_value, color_err, color_type,
+            v_magnitude, v_magnitude_err, distance, distance_err).
+
+    Returns:
+        A list with a (record, Lbol, uncertainty, valid) tuple for each
+        record. Lbol and uncertainty are NaN where valid is False.
+    """
+    columns = dict((field, np.array([record[field] for record in records]))
+                   for field in FIELDS)
+    Lbol, Lbol_err, valid = calc_Lbol_batch(**columns)
+    return list(zip(records, Lbol.tolist(), Lbol_err.tolist(),
+                    valid.tolist()))
+
+async def stream_Lbol(records, max_batch_size=1024, max_latency=0.01,
+                      max_pending=None, executor=None, on_error=None):
+    """Yields bolometric luminosities for a stream of records.
+
+    Args:
+        records: Async iterable of mappings, each holding a value for
+            every name in FIELDS.
+        max_batch_size: Largest number of records calculated together.
+        max_latency: Longest time in seconds a record waits for its
+            batch to fill up.
+        max_pending: Largest number of records read ahead of the
+            consumer. Defaults to 4 * max_batch_size.
+        executor: Optional concurrent.futures executor to run the
+            calculation in, so that large batches do not block the
+            event loop. By default it runs in the event loop.
+        on_error: Optional function called with (record, error) for
+            each record which is not valid, where error is the
+            ValueError describing it.
+
+    Yields:
+        A (record, Lbol, uncertainty, valid) tuple for each record, in
+        arrival order. Lbol and uncertainty are NaN where valid is
+        False, including records which are not valid.
+
+    Raises:
+        Any exception raised by the source, once the records which
+        arrived before it have been yielded.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(max_pending or 4 * max_batch_size)
+    producer = asyncio.ensure_future(_produce(records, queue))
+    getter = None
+    failure = None
+    finished = False
+
+    try:
+        while not finished:
+            batch = []
+            deadline = None
+            while len(batch) < max_batch_size:
+                # The pending get is kept across batches, so a record it
+                # receives after a deadline is never lost.
+                if getter is None:
+                    getter = asyncio.ensure_future(queue.get())
+                if deadline is None:
+                    await asyncio.wait([getter])
+                    deadline = loop.time() + max_latency
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout > 0 and not getter.done():
+                        await asyncio.wait([getter], timeout=timeout)
+                    if not getter.done():
+                        break
+
+                item = getter.result()
+                getter = None
+                if item is _END or isinstance(item, _Failure):
+                    failure = item if item is not _END else None
+                    finished = True
+                    break
+                try:
+                    batch.append((item, _check_record(item)))
+                except ValueError as error:
+                    if on_error is not None:
+                        on_error(item, error)
+                    batch.append((item, None))
+
+            checked = [record for _, record in batch if record is not None]
+            if not checked:
+                results = iter(())
+            elif executor is None:
+                results = iter(calculate_records(checked))
+            else:
+                results = iter(await loop.run_in_executor(
+                    executor, calculate_records, checked))
+            for item, record in batch:
+                if record is None:
+                    yield item, np.nan, np.nan, False
+                else:
+                    _, Lbol, Lbol_err, valid = next(results)
+                    yield item, Lbol, Lbol_err, valid
+    finally:
+        if getter is not None:
+            getter.cancel()
+        producer.cancel()
+
+    if failure is not None:
+        raise failure.error
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import lbol.bc_batch as bc_batch
+import lbol.bc_polynomial as bc_polynomial
+
+class TestBolometricCorrectionBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.color_value = np.array([-0.1, 0.422, 1.0, 1.6, 128.54])
+        self.color_err = np.array([0.04, 0.04, 0.02, 0.1, 0.04])
+        self.color_type = "BminusV"
+
+    def test_matches_scalar_bolometric_correction(self):
+        result, result_err, valid = \
+            bc_batch.calc_bolometric_correction_batch(self.color_value,
+                                                      self.color_err,
+                                                      self.color_type)
+        for i in range(4):
+            expected, expected_err = \
+                bc_polynomial.calc_bolometric_correction(
+                    self.color_value[i], self.color_err[i], self.color_type)
+            self.assertAlmostEqual(expected, result[i], places=12)
+            self.assertAlmostEqual(expected_err, result_err[i], places=12)
+            self.assertTrue(valid[i])
+
+    def test_out_of_range_color_is_masked(self):
+        result, result_err, valid = \
+            bc_batch.calc_bolometric_correction_batch(self.color_value,
+                                                      self.color_err,
+                                                      self.color_type)
+        self.assertFalse(valid[4])
+        self.assertTrue(np.isnan(result[4]))
+        self.assertTrue(np.isnan(result_err[4]))
+
+    def test_array_of_color_types(self):
+        color_value = np.array([0.5, 0.5, 0.5, 2.0])
+        color_type = np.array(["BminusV", "VminusI", "BminusI", "VminusI"])
+        result, result_err, valid = \
+            bc_batch.calc_bolometric_correction_batch(color_value, 0.04,
+                                                      color_type)
+        for i in range(3):
+            expected, expected_err = \
+                bc_polynomial.calc_bolometric_correction(0.5, 0.04,
+                                                         color_type[i])
+            self.assertAlmostEqual(expected, result[i], places=12)
+            self.assertAlmostEqual(expected_err, result_err[i], places=12)
+        self.assertEqual([True, True, True, False], valid.tolist())
+
+    def test_bad_color_type_value(self):
+        self.assertRaises(ValueError,
+                          bc_batch.calc_bolometric_correction_batch,
+                          self.color_value, self.color_err, "Hello")
+
+if __name__ == '__main__':
+    unittest.main()
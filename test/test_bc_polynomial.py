@@ -1,4 +1,5 @@
 import unittest
+import threading
 import lbol.bc_polynomial as bc_polynomial
 import lbol.constants as constants
 
@@ -70,6 +71,43 @@ class TestSetConstants(unittest.TestCase):
     def test_set_constants_bad_argument_value(self):
         self.assertRaises(ValueError, bc_polynomial.set_constants, 'Hello')
 
+class TestBCModel(unittest.TestCase):
+
+    def test_model_matches_constants(self):
+        model = bc_polynomial.get_model("BminusI")
+        self.assertEqual(tuple(constants.coeff_BminusI), model.coefficients)
+        self.assertEqual(constants.min_BminusI, model.range_min)
+        self.assertEqual(constants.max_BminusI, model.range_max)
+        self.assertEqual(constants.rms_err_BminusI, model.rms_err)
+
+    def test_derivative_coefficients(self):
+        model = bc_polynomial.get_model("VminusI")
+        expected = [order * constants.coeff_VminusI[order]
+                    for order in range(1, len(constants.coeff_VminusI))]
+        self.assertEqual(expected, list(model.derivative_coefficients))
+
+    def test_model_is_immutable(self):
+        model = bc_polynomial.get_model("BminusV")
+        self.assertRaises(AttributeError, setattr, model, "rms_err", 0.0)
+        self.assertRaises(AttributeError, setattr, model, "extra", 0.0)
+
+    def test_get_model_passes_model_through(self):
+        model = bc_polynomial.MODELS["BminusV"]
+        self.assertIs(model, bc_polynomial.get_model(model))
+
+    def test_bolometric_correction_with_model(self):
+        expected = bc_polynomial.calc_bolometric_correction(0.422, 0.04,
+                                                            "BminusV")
+        result = bc_polynomial.calc_bolometric_correction(
+            0.422, 0.04, bc_polynomial.MODELS["BminusV"])
+        self.assertEqual(expected, result)
+
+    def test_get_model_bad_argument_type(self):
+        self.assertRaises(TypeError, bc_polynomial.get_model, 2)
+
+    def test_get_model_bad_argument_value(self):
+        self.assertRaises(ValueError, bc_polynomial.get_model, 'Hello')
+
 class TestValidityCheck(unittest.TestCase):
     
     def test_color_in_valid_range(self):
@@ -138,6 +176,26 @@ class TestCalculateDerivativeTerm(unittest.TestCase):
             bc_polynomial.calculate_polynomial_derivative_term,
             self.coefficient, self.color_value, order)
 
+class TestCalculatePolynomialAndDerivative(unittest.TestCase):
+
+    def setUp(self):
+        self.coefficients = [1.2, 4.6, 2.5, 633.3, 34.3]
+        self.variable = 3.2
+
+    def test_polynomial(self):
+        expected = bc_polynomial.calculate_polynomial(self.coefficients,
+                                                      self.variable)
+        result = bc_polynomial.calculate_polynomial_and_derivative(
+            self.coefficients, self.variable)[0]
+        self.assertAlmostEqual(expected, result, places=8)
+
+    def test_derivative(self):
+        expected = bc_polynomial.calculate_polynomial_derivative(
+            self.coefficients, self.variable)
+        result = bc_polynomial.calculate_polynomial_and_derivative(
+            self.coefficients, self.variable)[1]
+        self.assertAlmostEqual(expected, result, places=8)
+
 class TestQuadratureSum(unittest.TestCase):
     
     def test_quadrature_sum(self):
@@ -182,5 +240,74 @@ class TestBolometricCorrection(unittest.TestCase):
                                                          self.color_type)[0]
         self.assertEqual(expected, result)
 
+class TestBCCache(unittest.TestCase):
+
+    def tearDown(self):
+        bc_polynomial.disable_cache()
+
+    def test_cached_result_matches_uncached(self):
+        expected = bc_polynomial.calc_bolometric_correction(0.422, 0.04,
+                                                            "BminusV")
+        bc_polynomial.enable_cache()
+        self.assertEqual(expected, bc_polynomial.calc_bolometric_correction(
+            0.422, 0.04, "BminusV"))
+        self.assertEqual(expected, bc_polynomial.calc_bolometric_correction(
+            0.422, 0.04, "BminusV"))
+        self.assertEqual((1, 1), bc_polynomial.cache_info()[:2])
+
+    def test_least_recently_used_is_evicted(self):
+        cache = bc_polynomial.BCCache(maxsize=2)
+        cache.lookup(0.1, 0.04, "BminusV")
+        cache.lookup(0.2, 0.04, "BminusV")
+        cache.lookup(0.1, 0.04, "BminusV")
+        cache.lookup(0.3, 0.04, "BminusV")
+        cache.lookup(0.1, 0.04, "BminusV")
+        cache.lookup(0.2, 0.04, "BminusV")
+        self.assertEqual(bc_polynomial.CacheInfo(2, 4, 2, 2), cache.info())
+
+    def test_quantized_colors_share_an_entry(self):
+        cache = bc_polynomial.BCCache(quantum=0.01)
+        first = cache.lookup(0.4221, 0.04, "BminusV")
+        second = cache.lookup(0.4219, 0.04, "BminusV")
+        self.assertEqual(first, second)
+        self.assertEqual(1, cache.info().hits)
+
+    def test_quantized_color_at_range_edge_is_valid(self):
+        cache = bc_polynomial.BCCache(quantum=0.01)
+        bolometric_correction, uncertainty = cache.lookup(1.65, 0.04,
+                                                          "BminusV")
+        expected = bc_polynomial.calc_bolometric_correction(1.65, 0.04,
+                                                            "BminusV")
+        self.assertAlmostEqual(expected[0], bolometric_correction)
+        self.assertAlmostEqual(expected[1], uncertainty)
+
+    def test_quantized_cache_rejects_nonfinite_colors(self):
+        cache = bc_polynomial.BCCache(quantum=0.01)
+        for color_value in (float("nan"), float("inf"), -float("inf")):
+            self.assertEqual((-999, -999),
+                             cache.lookup(color_value, 0.04, "BminusV"))
+        self.assertEqual(0, cache.info().currsize)
+
+    def test_toggling_cache_from_another_thread(self):
+        stop = threading.Event()
+
+        def toggle():
+            while not stop.is_set():
+                bc_polynomial.enable_cache()
+                bc_polynomial.disable_cache()
+
+        thread = threading.Thread(target=toggle)
+        thread.start()
+        try:
+            for _ in range(20000):
+                bc_polynomial.calc_bolometric_correction(0.422, 0.04,
+                                                         "BminusV")
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_disabled_cache(self):
+        self.assertIsNone(bc_polynomial.cache_info())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import lbol.bc_batch as bc_batch
+import lbol.bc_polynomial as bc_polynomial
+import lbol.bc_table as bc_table
+
+class TestBCTable(unittest.TestCase):
+
+    def test_max_error_against_polynomial(self):
+        for name in ("BminusV", "VminusI", "BminusI"):
+            model = bc_polynomial.MODELS[name]
+            table = bc_table.get_table(name)
+            color_value = np.linspace(model.range_min, model.range_max,
+                                      100003)
+            expected = bc_polynomial.calculate_polynomial(
+                model.coefficients, color_value)
+            expected_derivative = \
+                bc_polynomial.calculate_polynomial_derivative(
+                    model.coefficients, color_value)
+            result, result_derivative = table.evaluate(color_value)
+            self.assertLess(np.abs(result - expected).max(),
+                            bc_table.MAX_BC_ERROR)
+            self.assertLess(np.abs(result_derivative -
+                                   expected_derivative).max(),
+                            bc_table.MAX_DERIVATIVE_ERROR)
+
+    def test_table_is_built_once(self):
+        self.assertIs(bc_table.get_table("BminusI"),
+                      bc_table.get_table("BminusI"))
+
+    def test_table_method_in_batch(self):
+        color_value = np.array([-0.3, 0.0, 1.3, 2.9, 3.2])
+        expected = bc_batch.calc_bolometric_correction_batch(
+            color_value, 0.04, "BminusI")
+        result = bc_batch.calc_bolometric_correction_batch(
+            color_value, 0.04, "BminusI", method="table")
+        np.testing.assert_allclose(expected[0], result[0], atol=1e-9)
+        np.testing.assert_allclose(expected[1], result[1], atol=1e-9)
+        np.testing.assert_array_equal(expected[2], result[2])
+
+    def test_bad_method(self):
+        self.assertRaises(ValueError,
+                          bc_batch.calc_bolometric_correction_batch,
+                          0.5, 0.04, "BminusV", method="spline")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import lbol.binary_io as binary_io
+import lbol.cli as cli
+import lbol.luminosity_batch as luminosity_batch
+
+class TestBinaryCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, "catalog.npy")
+        self.output = os.path.join(self.directory, "results.npy")
+        catalog = np.zeros(5, dtype=[("bv", "f8"), ("bv_err", "f8"),
+                                     ("color_type", "S7"), ("V", "f8"),
+                                     ("V_err", "f8")])
+        catalog["bv"] = [0.5, 0.8, 1.2, 123.0, 0.1]
+        catalog["bv_err"] = 0.04
+        catalog["color_type"] = b"BminusV"
+        catalog["V"] = [16.59, 16.8, 17.1, 17.3, 15.0]
+        catalog["V_err"] = 0.02
+        np.save(self.input, catalog)
+        self.catalog = catalog
+        self.columns = {"color_value": "bv", "color_err": "bv_err",
+                        "v_magnitude": "V", "v_magnitude_err": "V_err"}
+        self.fixed = {"distance": 1.54E23, "distance_err": 0.308E23}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_process_catalog_matches_batch(self):
+        rows = binary_io.process_catalog(self.input, self.output,
+                                         self.columns, self.fixed,
+                                         chunk_size=2)
+        self.assertEqual(5, rows)
+        results = np.load(self.output)
+        expected = luminosity_batch.calc_Lbol_batch(
+            self.catalog["bv"], 0.04, "BminusV", self.catalog["V"], 0.02,
+            1.54E23, 0.308E23)
+        np.testing.assert_allclose(expected[0], results["Lbol"],
+                                   rtol=1e-12)
+        np.testing.assert_allclose(expected[1], results["Lbol_err"],
+                                   rtol=1e-12)
+        np.testing.assert_array_equal(expected[2], results["valid"])
+
+    def test_chunks_are_views_of_the_catalog(self):
+        catalog = binary_io.open_catalog(self.input)
+        chunk = next(binary_io.read_chunks(catalog, self.columns,
+                                           {"color_type": "BminusV"}, 3))
+        self.assertTrue(np.shares_memory(chunk["color_value"], catalog))
+
+    def test_missing_column(self):
+        self.columns["color_value"] = "BV"
+        self.assertRaises(ValueError, binary_io.process_catalog,
+                          self.input, self.output, self.columns,
+                          self.fixed)
+
+    def test_cli_npy_to_npy(self):
+        status = cli.main([self.input, "-o", self.output, "--quiet",
+                           "--column", "color_value=bv",
+                           "--column", "color_err=bv_err",
+                           "--column", "v_magnitude=V",
+                           "--column", "v_magnitude_err=V_err",
+                           "--distance", "1.54E23",
+                           "--distance-err", "0.308E23"])
+        self.assertEqual(0, status)
+        results = np.load(self.output)
+        self.assertEqual([True, True, True, False, True],
+                         results["valid"].tolist())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import lbol.bc_batch as bc_batch
+import lbol.calibrations as calibrations
+import lbol.luminosity_batch as luminosity_batch
+
+class TestCalibrations(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "shifted.json")
+        default = calibrations.get_calibration()
+        data = default.to_dict()
+        data["name"] = "Shifted%s" % id(self)
+        for fit in data["colors"].values():
+            fit["coefficients"][0] += 0.1
+            fit["range"] = [0.0, 1.0]
+        with open(self.path, "w") as stream:
+            json.dump(data, stream)
+        self.colors = np.array([-0.1, 0.3, 0.9, 1.5])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_default_matches_constants(self):
+        model = calibrations.get_calibration().get_model("BminusV")
+        self.assertEqual((-0.2, 1.65), (model.range_min, model.range_max))
+        self.assertEqual(0.113, model.rms_err)
+
+    def test_load_is_cached_and_registered(self):
+        calibration = calibrations.load_calibration(self.path)
+        self.assertIs(calibration, calibrations.load_calibration(self.path))
+        self.assertIs(calibration,
+                      calibrations.get_calibration(calibration.name))
+
+    def test_loaded_model_works_with_batch_api(self):
+        model = calibrations.load_calibration(self.path).get_model("BminusV")
+        expected = bc_batch.calc_bolometric_correction_batch(
+            self.colors, 0.04, "BminusV")[0]
+        bc, bc_err, valid = bc_batch.calc_bolometric_correction_batch(
+            self.colors, 0.04, model)
+        self.assertEqual([False, True, True, False], valid.tolist())
+        np.testing.assert_allclose(expected[1:3] + 0.1, bc[1:3])
+        luminosity_batch.calc_Lbol_batch(self.colors, 0.04, model, 16.5,
+                                         0.02, 1.5E23, 0.0)
+
+    def test_matrix_evaluation_matches_batch(self):
+        shifted = calibrations.load_calibration(self.path)
+        bc, bc_err, valid, names = \
+            calibrations.calc_bolometric_correction_calibrations(
+                self.colors, 0.04, "BminusI",
+                [calibrations.DEFAULT_CALIBRATION, shifted])
+        self.assertEqual((2, 4), bc.shape)
+        self.assertEqual([calibrations.DEFAULT_CALIBRATION, shifted.name],
+                         names)
+        for row, name in enumerate(names):
+            model = calibrations.get_calibration(name).get_model("BminusI")
+            expected = bc_batch.calc_bolometric_correction_batch(
+                self.colors, 0.04, model)
+            np.testing.assert_allclose(expected[0], bc[row])
+            np.testing.assert_allclose(expected[1], bc_err[row])
+            self.assertEqual(expected[2].tolist(), valid[row].tolist())
+
+    def test_malformed_file(self):
+        with open(self.path, "w") as stream:
+            json.dump({"name": "Broken", "colors": {"BminusV": {}}}, stream)
+        self.assertRaises(ValueError, calibrations.load_calibration,
+                          self.path)
+
+    def test_name_clash(self):
+        calibration = calibrations.calibration_from_dict(
+            calibrations.get_calibration().to_dict())
+        self.assertRaises(ValueError, calibrations.register_calibration,
+                          calibration)
+
+    def test_load_name_clash_is_not_cached(self):
+        data = calibrations.get_calibration().to_dict()
+        with open(self.path, "w") as stream:
+            json.dump(data, stream)
+        for _ in range(2):
+            self.assertRaises(ValueError, calibrations.load_calibration,
+                              self.path)
+        self.assertNotIn(os.path.realpath(self.path), calibrations._loaded)
+
+if __name__ == '__main__':
+    unittest.main()
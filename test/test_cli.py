@@ -0,0 +1,111 @@
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import numpy as np
+import lbol.cli as cli
+import lbol.luminosity as luminosity
+
+INPUT = """color_value,color_err,v_magnitude,v_magnitude_err
+0.5,0.04,16.59,0.02
+0.8,0.03,16.8,0.02
+123.0,0.04,17.3,0.02
+"""
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.columns = dict((field, field) for field in cli.FIELDS)
+        self.fixed = {"color_type": "BminusV", "distance": 1.54E23,
+                      "distance_err": 0.308E23}
+
+    def run_pipeline(self, text, chunk_size, **kwargs):
+        chunks = cli.parse_chunks(io.StringIO(text), self.columns,
+                                  self.fixed, chunk_size, **kwargs)
+        chunks = cli.add_Lbol(cli.add_Fbol(
+            cli.add_bolometric_correction(chunks)))
+        return list(chunks)
+
+    def test_chunk_sizes(self):
+        chunks = self.run_pipeline(INPUT, 2)
+        self.assertEqual([2, 1], [len(chunk["rows"]) for chunk in chunks])
+
+    def test_Lbol_matches_scalar(self):
+        chunk = self.run_pipeline(INPUT, 10)[0]
+        expected = luminosity.calc_Lbol(0.8, 0.03, "BminusV", 16.8, 0.02,
+                                        1.54E23, 0.308E23)
+        self.assertAlmostEqual(1.0, chunk["Lbol"][1] / expected[0])
+        self.assertAlmostEqual(1.0, chunk["Lbol_err"][1] / expected[1])
+        self.assertTrue(np.isnan(chunk["Lbol"][2]))
+
+    def test_column_mapping_and_ascii_input(self):
+        self.columns["color_value"] = "BV"
+        text = ("# BV color_err v_magnitude v_magnitude_err\n"
+                "0.5 0.04 16.59 0.02\n")
+        chunk = self.run_pipeline(text, 10, input_format="ascii")[0]
+        self.assertEqual([0.5], chunk["color_value"].tolist())
+
+    def test_missing_column(self):
+        self.columns["color_value"] = "BV"
+        self.assertRaises(ValueError, self.run_pipeline, INPUT, 10)
+
+    def test_short_row_reports_line(self):
+        with self.assertRaisesRegex(ValueError, "^Line 3 "):
+            self.run_pipeline(INPUT.replace("0.8,0.03,16.8,0.02",
+                                            "0.8,0.03"), 10)
+
+    def test_bad_number_reports_line(self):
+        text = ("# color_value color_err v_magnitude v_magnitude_err\n"
+                "0.5 0.04 16.59 0.02\n\n"
+                "0.5 0.04 bright 0.02\n")
+        with self.assertRaisesRegex(ValueError, "^Line 4: 'v_magnitude'"):
+            self.run_pipeline(text, 10, input_format="ascii")
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, "input.csv")
+        self.output = os.path.join(self.directory, "output.csv")
+        with open(self.input, "w") as infile:
+            infile.write(INPUT)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_main_writes_results(self):
+        status = cli.main([self.input, "-o", self.output, "--quiet",
+                           "--chunk-size", "2", "--color-type", "BminusV",
+                           "--distance", "1.54E23",
+                           "--distance-err", "0.308E23"])
+        self.assertEqual(0, status)
+        with open(self.output) as outfile:
+            lines = outfile.read().splitlines()
+        self.assertEqual(4, len(lines))
+        self.assertTrue(lines[0].endswith(",".join(cli.RESULT_COLUMNS)))
+        self.assertTrue(lines[3].endswith("nan,nan"))
+
+    def test_main_reports_missing_input(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = cli.main([os.path.join(self.directory, "missing.csv"),
+                               "-o", self.output, "--quiet"])
+        self.assertEqual(1, status)
+        self.assertTrue(stderr.getvalue().startswith("error: "))
+
+    def test_main_reports_short_row(self):
+        with open(self.input, "a") as infile:
+            infile.write("0.5,0.04\n")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = cli.main([self.input, "-o", self.output, "--quiet",
+                               "--color-type", "BminusV",
+                               "--distance", "1.54E23",
+                               "--distance-err", "0.308E23"])
+        self.assertEqual(1, status)
+        self.assertTrue(stderr.getvalue().startswith("error: Line 5 "))
+
+if __name__ == '__main__':
+    unittest.main()
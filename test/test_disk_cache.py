@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import lbol.constants as constants
+import lbol.disk_cache as disk_cache
+import lbol.luminosity_batch as luminosity_batch
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = disk_cache.DiskCache(self.directory)
+        self.args = (np.array([0.5, 0.8, 123.0]), 0.04, "BminusV",
+                     np.array([16.59, 16.8, 17.3]), 0.02, 1.54E23, 0.308E23)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hit_returns_stored_results(self):
+        expected = luminosity_batch.calc_Lbol_batch(*self.args)
+        first = self.cache.calc_Lbol_batch(*self.args)
+        second = self.cache.calc_Lbol_batch(*self.args)
+        for array, stored in zip(expected, second):
+            np.testing.assert_array_equal(array, stored)
+        info = self.cache.info()
+        self.assertEqual((1, 1, 1), (info.hits, info.misses, info.entries))
+
+    def test_inputs_change_key(self):
+        self.cache.calc_Lbol_batch(*self.args)
+        args = list(self.args)
+        args[3] = args[3] + 0.1
+        self.cache.calc_Lbol_batch(*args)
+        self.cache.calc_Lbol_batch(*self.args, method="table")
+        self.assertEqual(3, self.cache.info().entries)
+
+    def test_object_arrays_hash_by_content(self):
+        def make_inputs():
+            color_type = np.array(["Bminus" + "V", "V" + "minusI"],
+                                  dtype=object)
+            return np.array([0.5, 0.8], dtype=object), color_type
+        first = self.cache.key("f", [make_inputs()[0]], make_inputs()[1], {})
+        second = self.cache.key("f", [make_inputs()[0]], make_inputs()[1],
+                                {})
+        swapped = self.cache.key("f", [make_inputs()[0]],
+                                 make_inputs()[1][::-1].copy(), {})
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, swapped)
+
+    def test_constants_change_invalidates(self):
+        self.cache.calc_Lbol_batch(*self.args)
+        original = constants.mbol_zeropoint
+        constants.mbol_zeropoint = original + 1.0
+        try:
+            self.cache.calc_Lbol_batch(*self.args)
+        finally:
+            constants.mbol_zeropoint = original
+        self.assertEqual((0, 2), self.cache.info()[:2])
+
+    def test_no_temporary_files_left(self):
+        self.cache.calc_bolometric_correction_batch(self.args[0], 0.04,
+                                                    "BminusV")
+        names = os.listdir(self.directory)
+        self.assertEqual(1, len(names))
+        self.assertTrue(names[0].endswith(".npz"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        colors = [np.full(1000, color) for color in (0.1, 0.2, 0.3)]
+        self.cache.calc_bolometric_correction_batch(colors[0], 0.04,
+                                                    "BminusV")
+        size = self.cache.info().current_bytes
+        self.cache.max_bytes = 2 * size
+        self.cache.calc_bolometric_correction_batch(colors[1], 0.04,
+                                                    "BminusV")
+        # Make colors[1] the most recently used, then touch colors[0]
+        # with a hit.
+        first, second = [
+            os.path.join(self.directory, self.cache.key(
+                "calc_bolometric_correction_batch", [color, 0.04], "BminusV",
+                {"method": "polynomial"}) + ".npz")
+            for color in colors[:2]]
+        os.utime(first, (1, 1))
+        os.utime(second, (2, 2))
+        self.cache.calc_bolometric_correction_batch(colors[0], 0.04,
+                                                    "BminusV")
+        self.cache.calc_bolometric_correction_batch(colors[2], 0.04,
+                                                    "BminusV")
+        self.assertEqual(2, self.cache.info().entries)
+        self.cache.calc_bolometric_correction_batch(colors[0], 0.04,
+                                                    "BminusV")
+        self.assertEqual(2, self.cache.info().hits)
+
+if __name__ == '__main__':
+    unittest.main()
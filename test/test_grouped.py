@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+import lbol.grouped as grouped
+import lbol.luminosity_batch as luminosity_batch
+
+class TestGrouped(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(1)
+        self.objects = np.array(["SN1999em", "SN2004et", "SN2012aw"])
+        self.distance = np.array([3.6E25, 1.8E25, 3.1E25])
+        self.distance_err = 0.1 * self.distance
+        self.color_type = np.array(["BminusV", "VminusI", "BminusI"])
+        self.object_id = self.objects[rng.randint(0, 3, 200)]
+        self.color_value = rng.uniform(-0.3, 2.0, 200)
+        self.color_err = rng.uniform(0.01, 0.1, 200)
+        self.v_magnitude = rng.uniform(11.0, 16.0, 200)
+
+    def test_matches_per_object_batches_in_row_order(self):
+        Lbol, Lbol_err, valid = grouped.calc_Lbol_grouped(
+            self.object_id, self.color_value, self.color_err,
+            self.v_magnitude, 0.02, self.objects, self.distance,
+            self.distance_err, self.color_type)
+        for i, name in enumerate(self.objects):
+            rows = self.object_id == name
+            expected = luminosity_batch.calc_Lbol_batch(
+                self.color_value[rows], self.color_err[rows],
+                self.color_type[i], self.v_magnitude[rows], 0.02,
+                self.distance[i], self.distance_err[i])
+            np.testing.assert_allclose(expected[0], Lbol[rows], rtol=1e-12)
+            np.testing.assert_allclose(expected[1], Lbol_err[rows],
+                                       rtol=1e-12)
+            self.assertEqual(expected[2].tolist(), valid[rows].tolist())
+        self.assertTrue(np.any(~valid))
+
+    def test_single_color_type_and_integer_ids(self):
+        object_id = np.searchsorted(self.objects, self.object_id) + 100
+        Lbol = grouped.calc_Lbol_grouped(
+            object_id, self.color_value, self.color_err, self.v_magnitude,
+            0.02, np.array([102, 100, 101]), self.distance[[2, 0, 1]],
+            self.distance_err[[2, 0, 1]], "BminusV")[0]
+        expected = luminosity_batch.calc_Lbol_batch(
+            self.color_value, self.color_err, "BminusV", self.v_magnitude,
+            0.02, self.distance[object_id - 100], 0.0)[0]
+        np.testing.assert_allclose(expected, Lbol, rtol=1e-12)
+
+    def test_unknown_object(self):
+        self.assertRaises(ValueError, grouped.object_index,
+                          ["SN1999em", "SN1987A"], self.objects)
+
+    def test_duplicate_objects(self):
+        self.assertRaises(ValueError, grouped.object_index, ["SN1999em"],
+                          ["SN1999em", "SN1999em"])
+
+    def test_color_type_shape_must_match_objects(self):
+        for color_type in (self.color_type[:2],
+                           np.append(self.color_type, "BminusV")):
+            self.assertRaises(ValueError, grouped.calc_Lbol_grouped,
+                              self.object_id, self.color_value,
+                              self.color_err, self.v_magnitude, 0.02,
+                              self.objects, self.distance,
+                              self.distance_err, color_type)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import numpy as np
+import lbol.bc_batch as bc_batch
+import lbol.instrumentation as instrumentation
+import lbol.luminosity as luminosity
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.args = (0.5, 0.04, "BminusV", 16.59, 0.02, 1.54E23, 0.308E23)
+
+    def test_stage_call_counts(self):
+        with instrumentation.instrument() as stats:
+            luminosity.calc_Lbol(*self.args)
+            luminosity.calc_Lbol(*self.args)
+        self.assertEqual(2, stats.calls("calc_Lbol"))
+        self.assertEqual(2, stats.calls("calc_Fbol"))
+        self.assertEqual(2, stats.calls("calc_4piDsquared"))
+        self.assertEqual(2, stats.calls("valid_color"))
+        self.assertEqual(2, stats.calls("calculate_polynomial_and_derivative"))
+        self.assertGreater(stats.total_time("calc_Lbol"), 0.0)
+
+    def test_rejections_per_color_type(self):
+        with instrumentation.instrument() as stats:
+            luminosity.calc_Lbol(123.0, *self.args[1:])
+            bc_batch.calc_bolometric_correction_batch(
+                np.array([0.5, 5.0, 6.0]), 0.04,
+                np.array(["VminusI", "VminusI", "BminusV"]))
+        self.assertEqual(2, stats.rejections("BminusV"))
+        self.assertEqual(1, stats.rejections("VminusI"))
+        self.assertEqual(3, stats.rejections())
+
+    def test_disabled_outside_context(self):
+        with instrumentation.instrument() as stats:
+            pass
+        luminosity.calc_Lbol(*self.args)
+        self.assertFalse(instrumentation.enabled())
+        self.assertEqual(0, stats.calls("calc_Lbol"))
+
+    def test_plain_functions_when_disabled(self):
+        plain = luminosity.calc_Lbol
+        self.assertFalse(hasattr(plain, "__wrapped__"))
+        with instrumentation.instrument():
+            self.assertIs(plain, luminosity.calc_Lbol.__wrapped__)
+            self.assertIsNot(bc_batch.calc_bolometric_correction_batch,
+                             bc_batch.calc_bolometric_correction_batch
+                             .__wrapped__)
+        self.assertIs(plain, luminosity.calc_Lbol)
+        self.assertFalse(hasattr(bc_batch.calc_bolometric_correction_batch,
+                                 "__wrapped__"))
+
+    def test_nested_instrument_blocks(self):
+        with instrumentation.instrument() as outer:
+            with instrumentation.instrument() as inner:
+                luminosity.calc_4piDsquared(1.54E23, 0.308E23)
+            luminosity.calc_4piDsquared(1.54E23, 0.308E23)
+        self.assertEqual(1, inner.calls("calc_4piDsquared"))
+        self.assertEqual(2, outer.calls("calc_4piDsquared"))
+
+    def test_blocks_exiting_out_of_order(self):
+        first = instrumentation.instrument()
+        second = instrumentation.instrument()
+        a = first.__enter__()
+        b = second.__enter__()
+        first.__exit__(None, None, None)
+        luminosity.calc_4piDsquared(1.54E23, 0.308E23)
+        second.__exit__(None, None, None)
+        luminosity.calc_4piDsquared(1.54E23, 0.308E23)
+        self.assertEqual(0, a.calls("calc_4piDsquared"))
+        self.assertEqual(1, b.calls("calc_4piDsquared"))
+        self.assertFalse(instrumentation.enabled())
+        self.assertFalse(hasattr(luminosity.calc_4piDsquared, "__wrapped__"))
+
+    def test_enable_and_disable(self):
+        stats = instrumentation.enable()
+        try:
+            with instrumentation.instrument():
+                pass
+            luminosity.calc_4piDsquared(1.54E23, 0.308E23)
+            self.assertIs(stats, instrumentation.get_stats())
+        finally:
+            instrumentation.disable()
+        self.assertEqual(1, stats.calls("calc_4piDsquared"))
+        self.assertFalse(instrumentation.enabled())
+
+    def test_snapshot_and_reset(self):
+        with instrumentation.instrument() as stats:
+            luminosity.calc_4piDsquared(1.54E23, 0.308E23)
+        self.assertEqual(1, stats.snapshot()["stages"]
+                         ["calc_4piDsquared"]["calls"])
+        stats.reset()
+        self.assertEqual({"stages": {}, "rejections": {}}, stats.snapshot())
+
+if __name__ == '__main__':
+    unittest.main()
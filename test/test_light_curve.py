@@ -0,0 +1,79 @@
+import unittest
+import math
+import numpy as np
+import lbol.light_curve as light_curve
+import lbol.luminosity_batch as luminosity_batch
+
+class TestLightCurve(unittest.TestCase):
+
+    def setUp(self):
+        self.times = np.array([0.0, 1.5, 4.0, 10.0, 12.0, 20.0])
+        self.color_values = np.array([0.3, 0.4, 9.0, 0.6, 0.8, 1.1])
+        self.color_errs = np.array([0.04, 0.03, 0.04, 0.05, 0.04, 0.06])
+        self.v_magnitudes = np.array([16.2, 16.3, 16.4, 16.5, 16.7, 17.0])
+        self.v_magnitude_errs = 0.02
+        self.distance = 1.54E23
+        self.distance_err = 0.308E23
+
+    def make_light_curve(self):
+        return light_curve.LightCurve("BminusV", self.distance,
+                                      self.distance_err)
+
+    def expected_energy(self):
+        Lbol, Lbol_err, valid = luminosity_batch.calc_Lbol_batch(
+            self.color_values, self.color_errs, "BminusV", self.v_magnitudes,
+            self.v_magnitude_errs, self.distance, self.distance_err)
+        times = self.times[valid] * light_curve.SECONDS_PER_DAY
+        Lbol = Lbol[valid]
+        return np.sum(0.5 * np.diff(times) * (Lbol[:-1] + Lbol[1:]))
+
+    def test_energy_matches_trapezoid(self):
+        curve = self.make_light_curve()
+        curve.extend(self.times, self.color_values, self.color_errs,
+                     self.v_magnitudes, self.v_magnitude_errs)
+        self.assertAlmostEqual(1.0, curve.energy()[0] /
+                               self.expected_energy(), places=12)
+
+    def test_append_matches_extend(self):
+        batch = self.make_light_curve()
+        batch.extend(self.times, self.color_values, self.color_errs,
+                     self.v_magnitudes, self.v_magnitude_errs)
+        incremental = self.make_light_curve()
+        for i in range(len(self.times)):
+            incremental.append(self.times[i], self.color_values[i],
+                               self.color_errs[i], self.v_magnitudes[i],
+                               self.v_magnitude_errs)
+        self.assertEqual(6, len(incremental))
+        for expected, result in zip(batch.energy(), incremental.energy()):
+            self.assertAlmostEqual(1.0, result / expected, places=12)
+
+    def test_fluence_uncertainty(self):
+        curve = self.make_light_curve()
+        curve.extend(self.times[:2], self.color_values[:2],
+                     self.color_errs[:2], self.v_magnitudes[:2],
+                     self.v_magnitude_errs)
+        Fbol, Fbol_err, _ = luminosity_batch.calc_Fbol_batch(
+            self.color_values[:2], self.color_errs[:2], "BminusV",
+            self.v_magnitudes[:2], self.v_magnitude_errs)
+        step = 1.5 * light_curve.SECONDS_PER_DAY
+        expected = 0.5 * step * math.hypot(Fbol_err[0], Fbol_err[1])
+        self.assertAlmostEqual(1.0, curve.fluence()[1] / expected,
+                               places=12)
+
+    def test_invalid_epochs_are_kept_but_skipped(self):
+        curve = self.make_light_curve()
+        curve.extend(self.times, self.color_values, self.color_errs,
+                     self.v_magnitudes, self.v_magnitude_errs)
+        times, Lbol, Lbol_err, valid = curve.luminosities()
+        self.assertEqual(6, len(times))
+        self.assertFalse(valid[2])
+        self.assertTrue(np.isnan(Lbol[2]))
+
+    def test_epochs_out_of_order(self):
+        curve = self.make_light_curve()
+        curve.append(5.0, 0.5, 0.04, 16.5, 0.02)
+        self.assertRaises(ValueError, curve.append, 4.0, 0.5, 0.04, 16.5,
+                          0.02)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -127,5 +127,31 @@ class TestLogLbol(unittest.TestCase):
                                           self.distance_err)[1]
         self.assertEqual(expected, result)
 
+    def test_log_Lbol(self):
+        Lbol, Lbol_err = luminosity.calc_Lbol(self.color_value,
+                                              self.color_err,
+                                              self.color_type,
+                                              self.v_magnitude,
+                                              self.v_magnitude_err,
+                                              self.distance,
+                                              self.distance_err)
+        result = luminosity.calc_log_Lbol(self.color_value, self.color_err,
+                                          self.color_type,
+                                          self.v_magnitude,
+                                          self.v_magnitude_err,
+                                          self.distance,
+                                          self.distance_err)
+        self.assertAlmostEqual(math.log10(Lbol), result[0])
+        self.assertAlmostEqual(Lbol_err / (Lbol * math.log(10)), result[1])
+
+    def test_log_Lbol_is_bad_if_bc_is_bad(self):
+        result = luminosity.calc_log_Lbol(123.0, self.color_err,
+                                          self.color_type,
+                                          self.v_magnitude,
+                                          self.v_magnitude_err,
+                                          self.distance,
+                                          self.distance_err)
+        self.assertEqual((-999, -999), result)
+
 if __name__ == '__main__':
     unittest.main()
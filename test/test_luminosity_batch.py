@@ -0,0 +1,180 @@
+import unittest
+import numpy as np
+import lbol.bc_batch as bc_batch
+import lbol.luminosity as luminosity
+import lbol.luminosity_batch as luminosity_batch
+
+class TestLbolBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.color_value = np.array([0.5, 0.8, 1.2, 123.0])
+        self.color_err = np.array([0.04, 0.03, 0.05, 0.04])
+        self.color_type = "BminusV"
+        self.v_magnitude = np.array([16.59, 16.8, 17.1, 17.3])
+        self.v_magnitude_err = np.array([0.02, 0.02, 0.03, 0.02])
+        self.distance = 1.54E23
+        self.distance_err = 0.308E23
+
+    def test_Fbol_matches_scalar(self):
+        Fbol, Fbol_err, valid = luminosity_batch.calc_Fbol_batch(
+            self.color_value, self.color_err, self.color_type,
+            self.v_magnitude, self.v_magnitude_err)
+        for i in range(3):
+            expected, expected_err = luminosity.calc_Fbol(
+                self.color_value[i], self.color_err[i], self.color_type,
+                self.v_magnitude[i], self.v_magnitude_err[i])
+            self.assertAlmostEqual(1.0, Fbol[i] / expected, places=12)
+            self.assertAlmostEqual(1.0, Fbol_err[i] / expected_err,
+                                   places=12)
+
+    def test_Lbol_matches_scalar(self):
+        Lbol, Lbol_err, valid = luminosity_batch.calc_Lbol_batch(
+            self.color_value, self.color_err, self.color_type,
+            self.v_magnitude, self.v_magnitude_err, self.distance,
+            self.distance_err)
+        for i in range(3):
+            expected, expected_err = luminosity.calc_Lbol(
+                self.color_value[i], self.color_err[i], self.color_type,
+                self.v_magnitude[i], self.v_magnitude_err[i],
+                self.distance, self.distance_err)
+            self.assertAlmostEqual(1.0, Lbol[i] / expected, places=12)
+            self.assertAlmostEqual(1.0, Lbol_err[i] / expected_err,
+                                   places=12)
+
+    def test_Lbol_is_nan_if_bc_is_bad(self):
+        Lbol, Lbol_err, valid = luminosity_batch.calc_Lbol_batch(
+            self.color_value, self.color_err, self.color_type,
+            self.v_magnitude, self.v_magnitude_err, self.distance,
+            self.distance_err)
+        self.assertEqual([True, True, True, False], valid.tolist())
+        self.assertTrue(np.isnan(Lbol[3]))
+        self.assertTrue(np.isnan(Lbol_err[3]))
+
+    def test_distances_broadcast_against_epochs(self):
+        distance = np.array([[1.0E23], [2.0E23]])
+        Lbol = luminosity_batch.calc_Lbol_batch(
+            self.color_value, self.color_err, self.color_type,
+            self.v_magnitude, self.v_magnitude_err, distance,
+            0.1 * distance)[0]
+        self.assertEqual((2, 4), Lbol.shape)
+        np.testing.assert_allclose(4.0 * Lbol[0, :3], Lbol[1, :3])
+
+    def test_4piDsquared_matches_scalar(self):
+        expected = luminosity.calc_4piDsquared(self.distance,
+                                               self.distance_err)
+        result = luminosity_batch.calc_4piDsquared_batch(self.distance,
+                                                         self.distance_err)
+        self.assertAlmostEqual(1.0, result[0] / expected[0])
+        self.assertAlmostEqual(1.0, result[1] / expected[1])
+
+    def test_log_Lbol_matches_scalar(self):
+        log_Lbol, log_Lbol_err, valid = luminosity_batch.calc_log_Lbol_batch(
+            self.color_value, self.color_err, self.color_type,
+            self.v_magnitude, self.v_magnitude_err, self.distance,
+            self.distance_err)
+        for i in range(3):
+            expected, expected_err = luminosity.calc_log_Lbol(
+                self.color_value[i], self.color_err[i], self.color_type,
+                self.v_magnitude[i], self.v_magnitude_err[i],
+                self.distance, self.distance_err)
+            self.assertAlmostEqual(expected, log_Lbol[i], places=12)
+            self.assertAlmostEqual(expected_err, log_Lbol_err[i], places=12)
+        self.assertEqual([True, True, True, False], valid.tolist())
+        self.assertTrue(np.isnan(log_Lbol[3]))
+
+    def test_log_Lbol_in_float32(self):
+        expected = luminosity_batch.calc_log_Lbol_batch(
+            self.color_value, self.color_err, self.color_type,
+            self.v_magnitude, self.v_magnitude_err, self.distance,
+            self.distance_err)
+        result = luminosity_batch.calc_log_Lbol_batch(
+            self.color_value, self.color_err, self.color_type,
+            self.v_magnitude, self.v_magnitude_err, self.distance,
+            self.distance_err, dtype=np.float32)
+        self.assertEqual(np.float32, result[0].dtype)
+        self.assertTrue(np.all(np.isfinite(result[0][:3])))
+        np.testing.assert_allclose(expected[0], result[0], rtol=1e-6)
+        np.testing.assert_allclose(expected[1], result[1], rtol=1e-5)
+
+class TestLbolJacobian(unittest.TestCase):
+
+    def setUp(self):
+        self.color_value = np.array([0.5, 0.8, 1.2, 123.0])
+        self.v_magnitude = np.array([16.59, 16.8, 17.1, 17.3])
+        self.distance = 1.54E23
+        self.args = (self.color_value, 0.04, "BminusV", self.v_magnitude,
+                     0.02, self.distance, 0.308E23)
+
+    def test_jacobian_matches_finite_differences(self):
+        Lbol, jacobian, Lbol_err, valid = \
+            luminosity_batch.calc_Lbol_jacobian(*self.args)
+        self.assertEqual((4, 3), jacobian.shape)
+        self.assertEqual([True, True, True, False], valid.tolist())
+        self.assertTrue(np.all(np.isnan(jacobian[3])))
+
+        def Lbol_at(color, v, distance):
+            return luminosity_batch.calc_Lbol_batch(
+                color, 0.04, "BminusV", v, 0.02, distance, 0.0)[0]
+        steps = [(1e-6, 0, 0), (0, 1e-6, 0), (0, 0, 1e-6 * self.distance)]
+        for axis, (dc, dv, dd) in enumerate(steps):
+            derivative = (Lbol_at(self.color_value + dc, self.v_magnitude + dv,
+                                  self.distance + dd) -
+                          Lbol_at(self.color_value - dc, self.v_magnitude - dv,
+                                  self.distance - dd)) / (2 * (dc + dv + dd))
+            np.testing.assert_allclose(derivative[:3], jacobian[:3, axis],
+                                       rtol=1e-6)
+
+    def test_uncertainty_is_batch_uncertainty_without_sqrt2(self):
+        Lbol, jacobian, Lbol_err, valid = \
+            luminosity_batch.calc_Lbol_jacobian(*self.args)
+        bc_err = bc_batch.calc_bolometric_correction_batch(
+            self.color_value, 0.04, "BminusV")[1]
+        expected = np.hypot(0.4 * np.log(10) * Lbol * np.hypot(bc_err, 0.02),
+                            2.0 * Lbol * 0.308E23 / self.distance)
+        np.testing.assert_allclose(expected, Lbol_err)
+
+    def test_covariance(self):
+        diagonal = np.diag([0.04**2, 0.02**2, 0.308E23**2])
+        expected = luminosity_batch.calc_Lbol_jacobian(*self.args)[2]
+        result = luminosity_batch.calc_Lbol_jacobian(
+            *self.args, covariance=diagonal)[2]
+        np.testing.assert_allclose(expected, result)
+
+        correlated = diagonal.copy()
+        correlated[0, 1] = correlated[1, 0] = 0.9 * 0.04 * 0.02
+        per_epoch = np.array([diagonal, correlated, diagonal, diagonal])
+        result = luminosity_batch.calc_Lbol_jacobian(
+            *self.args, covariance=per_epoch)[2]
+        np.testing.assert_allclose(expected[[0, 2]], result[[0, 2]])
+        self.assertNotAlmostEqual(1.0, result[1] / expected[1])
+
+class TestLbolDistanceSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.color_value = np.array([0.5, 0.8, 123.0])
+        self.v_magnitude = np.array([16.59, 16.8, 17.3])
+        self.distances = np.array([1.2E23, 1.54E23, 2.0E23, 2.3E23])
+        self.distance_errs = 0.2 * self.distances
+
+    def test_sweep_matches_batch_per_distance(self):
+        Lbol, Lbol_err, valid = luminosity_batch.calc_Lbol_distance_sweep(
+            self.color_value, 0.04, "BminusV", self.v_magnitude, 0.02,
+            self.distances, self.distance_errs)
+        self.assertEqual((3, 4), Lbol.shape)
+        for j in range(4):
+            expected = luminosity_batch.calc_Lbol_batch(
+                self.color_value, 0.04, "BminusV", self.v_magnitude, 0.02,
+                self.distances[j], self.distance_errs[j])
+            np.testing.assert_allclose(expected[0], Lbol[:, j], rtol=1e-12)
+            np.testing.assert_allclose(expected[1], Lbol_err[:, j],
+                                       rtol=1e-12)
+        self.assertEqual([True, True, False], valid.tolist())
+
+    def test_single_distance_error(self):
+        Lbol_err = luminosity_batch.calc_Lbol_distance_sweep(
+            self.color_value, 0.04, "BminusV", self.v_magnitude, 0.02,
+            self.distances, 0.1E23)[1]
+        self.assertEqual((3, 4), Lbol_err.shape)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+import lbol.luminosity as luminosity
+import lbol.monte_carlo as monte_carlo
+
+class TestLbolMonteCarlo(unittest.TestCase):
+
+    def setUp(self):
+        self.color_value = np.array([0.5, 0.8, 1.65, 123.0])
+        self.color_err = 0.001
+        self.color_type = "BminusV"
+        self.v_magnitude = 16.59
+        self.v_magnitude_err = 0.001
+        self.distance = 1.54E23
+        self.distance_err = 0.001E23
+
+    def run_monte_carlo(self, seed, **kwargs):
+        return monte_carlo.calc_Lbol_monte_carlo(
+            self.color_value, self.color_err, self.color_type,
+            self.v_magnitude, self.v_magnitude_err, self.distance,
+            self.distance_err, rng=np.random.default_rng(seed), **kwargs)
+
+    def test_median_close_to_analytic_Lbol(self):
+        result = self.run_monte_carlo(1, n_samples=2000)[0]
+        for i in range(2):
+            expected = luminosity.calc_Lbol(
+                self.color_value[i], self.color_err, self.color_type,
+                self.v_magnitude, self.v_magnitude_err, self.distance,
+                self.distance_err)[0]
+            self.assertAlmostEqual(1.0, result[i, 1] / expected, places=2)
+
+    def test_valid_fraction(self):
+        valid_fraction = self.run_monte_carlo(2)[1]
+        self.assertEqual(1.0, valid_fraction[0])
+        self.assertAlmostEqual(0.5, valid_fraction[2], delta=0.1)
+        self.assertEqual(0.0, valid_fraction[3])
+
+    def test_no_valid_samples_is_nan(self):
+        result = self.run_monte_carlo(3)[0]
+        self.assertTrue(np.isnan(result[3]).all())
+
+    def test_seeded_generator_is_reproducible(self):
+        first = self.run_monte_carlo(4, max_block_size=2000)[0]
+        second = self.run_monte_carlo(4, max_block_size=2000)[0]
+        np.testing.assert_array_equal(first, second)
+
+    def test_block_smaller_than_samples(self):
+        self.assertRaises(ValueError, self.run_monte_carlo, 5,
+                          n_samples=1000, max_block_size=999)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+import lbol.bc_polynomial as bc_polynomial
+import lbol.luminosity_batch as luminosity_batch
+import lbol.multicolor as multicolor
+
+class TestCombinedBolometricCorrection(unittest.TestCase):
+
+    def setUp(self):
+        self.color_values = {"BminusV": np.array([0.5, 0.5, np.nan, 9.0]),
+                             "VminusI": np.array([0.4, np.nan, np.nan, 9.0]),
+                             "BminusI": np.array([0.9, 9.0, 0.9, 9.0])}
+        self.color_errs = {"BminusV": 0.04, "VminusI": 0.03,
+                           "BminusI": 0.05}
+
+    def test_inverse_variance_weighting(self):
+        result, result_err, n_colors = \
+            multicolor.calc_bolometric_correction_combined(
+                self.color_values, self.color_errs)
+        estimates = [bc_polynomial.calc_bolometric_correction(
+            self.color_values[name][0], self.color_errs[name], name)
+            for name in ("BminusV", "VminusI", "BminusI")]
+        weights = [1.0 / err**2 for _, err in estimates]
+        expected = (sum(w * bc for w, (bc, _) in zip(weights, estimates)) /
+                    sum(weights))
+        self.assertAlmostEqual(expected, result[0], places=12)
+        self.assertAlmostEqual(sum(weights)**-0.5, result_err[0], places=12)
+        self.assertEqual(3, n_colors[0])
+
+    def test_single_usable_color_matches_scalar(self):
+        result, result_err, n_colors = \
+            multicolor.calc_bolometric_correction_combined(
+                self.color_values, self.color_errs)
+        expected = bc_polynomial.calc_bolometric_correction(0.5, 0.04,
+                                                            "BminusV")
+        self.assertAlmostEqual(expected[0], result[1], places=12)
+        self.assertAlmostEqual(expected[1], result_err[1], places=12)
+        self.assertEqual([3, 1, 1, 0], n_colors.tolist())
+
+    def test_no_usable_color_is_nan(self):
+        result, result_err, n_colors = \
+            multicolor.calc_bolometric_correction_combined(
+                self.color_values, self.color_errs)
+        self.assertTrue(np.isnan(result[3]))
+        self.assertTrue(np.isnan(result_err[3]))
+
+    def test_Lbol_combined_with_one_color_matches_batch(self):
+        expected = luminosity_batch.calc_Lbol_batch(
+            np.array([0.5, 0.8]), 0.04, "BminusV", 16.59, 0.02, 1.54E23,
+            0.308E23)
+        result = multicolor.calc_Lbol_combined(
+            {"BminusV": np.array([0.5, 0.8])}, {"BminusV": 0.04}, 16.59,
+            0.02, 1.54E23, 0.308E23)
+        np.testing.assert_allclose(expected[0], result[0], rtol=1e-12)
+        np.testing.assert_allclose(expected[1], result[1], rtol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
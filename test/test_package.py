@@ -0,0 +1,32 @@
+import unittest
+import subprocess
+import sys
+import lbol
+
+def run_python(code):
+    return subprocess.check_output([sys.executable, "-c", code],
+                                   universal_newlines=True).strip()
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_scalar_api_does_not_import_numpy(self):
+        result = run_python(
+            "import sys, lbol, lbol.luminosity\n"
+            "lbol.calc_Lbol(0.5, 0.04, 'BminusV', 16.59, 0.02, 1.54E23, "
+            "0.308E23)\n"
+            "print('numpy' in sys.modules)")
+        self.assertEqual("False", result)
+
+    def test_batch_name_loads_on_first_use(self):
+        import lbol.luminosity_batch as luminosity_batch
+        self.assertIs(luminosity_batch.calc_Lbol_batch, lbol.calc_Lbol_batch)
+
+    def test_submodule_attribute(self):
+        import lbol.constants as constants
+        self.assertIs(constants, lbol.constants)
+
+    def test_unknown_name(self):
+        self.assertRaises(AttributeError, getattr, lbol, "calc_nothing")
+
+if __name__ == '__main__':
+    unittest.main()
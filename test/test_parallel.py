@@ -0,0 +1,130 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import lbol.bc_batch as bc_batch
+import lbol.luminosity_batch as luminosity_batch
+import lbol.parallel as parallel
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.color_value = rng.uniform(-0.5, 3.5, 1001)
+        self.color_err = rng.uniform(0.01, 0.1, 1001)
+        self.color_type = np.array(["BminusV", "VminusI",
+                                    "BminusI"])[rng.randint(0, 3, 1001)]
+        self.v_magnitude = rng.uniform(14.0, 19.0, 1001)
+
+    def test_bolometric_correction_matches_serial(self):
+        expected = bc_batch.calc_bolometric_correction_batch(
+            self.color_value, self.color_err, self.color_type)
+        result = bc_batch.calc_bolometric_correction_batch(
+            self.color_value, self.color_err, self.color_type, workers=3)
+        for expected_array, result_array in zip(expected, result):
+            np.testing.assert_array_equal(expected_array, result_array)
+
+    def test_Lbol_matches_serial(self):
+        expected = luminosity_batch.calc_Lbol_batch(
+            self.color_value, self.color_err, "BminusI", self.v_magnitude,
+            0.02, 1.54E23, 0.308E23)
+        result = luminosity_batch.calc_Lbol_batch(
+            self.color_value, self.color_err, "BminusI", self.v_magnitude,
+            0.02, 1.54E23, 0.308E23, workers=2)
+        for expected_array, result_array in zip(expected, result):
+            np.testing.assert_array_equal(expected_array, result_array)
+
+    def test_thread_backend_matches_serial(self):
+        chunk_size = parallel.CHUNK_SIZE
+        parallel.CHUNK_SIZE = 100
+        try:
+            expected = bc_batch.calc_bolometric_correction_batch(
+                self.color_value, self.color_err, self.color_type)
+            result = bc_batch.calc_bolometric_correction_batch(
+                self.color_value, self.color_err, self.color_type,
+                workers=3, backend="thread")
+            for expected_array, result_array in zip(expected, result):
+                np.testing.assert_array_equal(expected_array, result_array)
+
+            distance = np.array([[1.0E23], [2.0E23]])
+            expected = luminosity_batch.calc_Lbol_batch(
+                self.color_value, self.color_err, self.color_type,
+                self.v_magnitude, 0.02, distance, 0.1 * distance)
+            result = luminosity_batch.calc_Lbol_batch(
+                self.color_value, self.color_err, self.color_type,
+                self.v_magnitude, 0.02, distance, 0.1 * distance, workers=4,
+                backend="thread")
+            self.assertEqual((2, 1001), result[0].shape)
+            for expected_array, result_array in zip(expected, result):
+                np.testing.assert_array_equal(expected_array, result_array)
+        finally:
+            parallel.CHUNK_SIZE = chunk_size
+
+    def test_unknown_backend(self):
+        for workers in (None, 2):
+            self.assertRaises(ValueError,
+                              bc_batch.calc_bolometric_correction_batch,
+                              self.color_value, self.color_err, "BminusV",
+                              workers=workers, backend="fiber")
+            self.assertRaises(ValueError, luminosity_batch.calc_Lbol_batch,
+                              self.color_value, self.color_err, "BminusV",
+                              self.v_magnitude, 0.02, 1.54E23, 0.308E23,
+                              workers=workers, backend="fiber")
+
+    def test_pools_are_shared_and_grow(self):
+        for backend, pool in (("thread", parallel._thread_pool),
+                              ("process", parallel._process_pool)):
+            pool.discard()
+            executors = []
+            for workers in (2, 3, 2, 3):
+                bc_batch.calc_bolometric_correction_batch(
+                    self.color_value, self.color_err, self.color_type,
+                    workers=workers, backend=backend)
+                executors.append(pool._executor)
+            self.assertEqual(3, pool.workers)
+            self.assertIsNot(executors[0], executors[1])
+            self.assertEqual(1, len(set(map(id, executors[1:]))))
+
+    def test_scratch_directory_falls_back_when_shm_is_full(self):
+        directory = parallel._shared_directory(2**62)
+        try:
+            self.assertFalse(directory.startswith("/dev/shm"))
+        finally:
+            os.rmdir(directory)
+
+    @unittest.skipUnless(hasattr(os, "posix_fallocate"),
+                         "needs posix_fallocate")
+    def test_buffer_too_large_raises(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.assertRaises(OSError, parallel._create_buffer,
+                              os.path.join(directory, "buffer"), float,
+                              2**58)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_thread_chunks_do_not_copy_broadcast_inputs(self):
+        _, (color_value, distance), _, _ = parallel._broadcast_inputs(
+            {"color_value": self.color_value, "distance": 1.54E23},
+            "BminusV")
+        chunk = parallel._chunker(color_value)(10, 20)
+        self.assertTrue(np.shares_memory(chunk, self.color_value))
+        self.assertEqual(1.54E23, parallel._chunker(distance)(10, 20))
+
+        _, (color_value, distance), _, _ = parallel._broadcast_inputs(
+            {"color_value": self.color_value,
+             "distance": np.array([[1.0], [2.0]])}, "BminusV")
+        np.testing.assert_array_equal(
+            distance.ravel()[995:1010],
+            parallel._chunker(distance)(995, 1010))
+
+    def test_shard_bounds_cover_input(self):
+        bounds = parallel._shard_bounds(10, 4)
+        self.assertEqual(0, bounds[0][0])
+        self.assertEqual(10, bounds[-1][1])
+        for (start, stop), (next_start, _) in zip(bounds, bounds[1:]):
+            self.assertEqual(stop, next_start)
+
+if __name__ == '__main__':
+    unittest.main()
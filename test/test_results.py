@@ -0,0 +1,76 @@
+import unittest
+import tracemalloc
+import numpy as np
+import lbol.luminosity_batch as luminosity_batch
+import lbol.results as results
+
+class TestLbolResult(unittest.TestCase):
+
+    def setUp(self):
+        self.color_value = np.array([0.5, 0.8, -3.0, 123.0, np.nan, 1.2])
+        self.v_magnitude = np.array([16.59, 16.8, 17.0, 17.3, 17.1, 17.5])
+        self.args = (self.color_value, 0.04, "BminusV", self.v_magnitude,
+                     0.02, 1.54E23, 0.308E23)
+
+    def test_float64_matches_batch(self):
+        expected = luminosity_batch.calc_Lbol_batch(*self.args)
+        result = results.calc_Lbol_result(*self.args)
+        np.testing.assert_allclose(expected[0], result.Lbol, rtol=1e-12)
+        np.testing.assert_allclose(expected[1], result.Lbol_err, rtol=1e-12)
+        self.assertEqual(expected[2].tolist(), result.valid.tolist())
+
+    def test_float32_in_units(self):
+        expected = luminosity_batch.calc_Lbol_batch(*self.args)
+        result = results.calc_Lbol_result(*self.args, dtype=np.float32)
+        self.assertEqual(np.float32, result.dtype)
+        self.assertEqual(1E40, result.unit)
+        np.testing.assert_allclose(
+            expected[0], result.Lbol.astype(float) * result.unit, rtol=1e-5)
+        np.testing.assert_allclose(
+            expected[1], result.Lbol_err.astype(float) * result.unit,
+            rtol=1e-5)
+        self.assertEqual(6 * (4 + 4 + 1 + 1), result.nbytes)
+
+    def test_reason_codes(self):
+        result = results.calc_Lbol_result(*self.args)
+        self.assertEqual([results.OK, results.OK, results.BELOW_RANGE,
+                          results.ABOVE_RANGE, results.NONFINITE,
+                          results.OK], result.reason.tolist())
+        self.assertEqual({"ok": 3, "below_range": 1, "above_range": 1,
+                          "nonfinite": 1}, result.counts())
+
+    def test_mixed_color_types(self):
+        color_type = np.array(["BminusV", "VminusI", "BminusI"] * 2)
+        expected = luminosity_batch.calc_Lbol_batch(
+            self.color_value, 0.04, color_type, self.v_magnitude, 0.02,
+            1.54E23, 0.308E23)
+        result = results.calc_Lbol_result(
+            self.color_value, 0.04, color_type, self.v_magnitude, 0.02,
+            1.54E23, 0.308E23)
+        np.testing.assert_allclose(expected[0], result.Lbol, rtol=1e-12)
+        self.assertEqual(expected[2].tolist(), result.valid.tolist())
+
+    def test_out_is_reused_without_allocation(self):
+        rng = np.random.RandomState(0)
+        colors = rng.uniform(-0.5, 2.0, 1000000)
+        out = results.LbolResult.empty(colors.shape, np.float32)
+        results.calc_Lbol_result(colors, 0.04, "BminusV", 16.5, 0.02,
+                                 1.54E23, 0.308E23, out=out)
+        tracemalloc.start()
+        try:
+            result = results.calc_Lbol_result(colors, 0.04, "BminusV", 16.5,
+                                              0.02, 1.54E23, 0.308E23,
+                                              out=out)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertIs(out, result)
+        self.assertLess(peak, colors.nbytes // 20)
+
+    def test_out_shape_mismatch(self):
+        out = results.LbolResult.empty(3)
+        self.assertRaises(ValueError, results.calc_Lbol_result, *self.args,
+                          out=out)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import lbol.bc_polynomial as bc_polynomial
+import lbol.luminosity as luminosity
+import lbol.service as service
+
+def make_record(color_value):
+    return {"color_value": color_value, "color_err": 0.04,
+            "color_type": "BminusV", "v_magnitude": 16.59,
+            "v_magnitude_err": 0.02, "distance": 1.54E23,
+            "distance_err": 0.308E23}
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def test_concurrent_requests_share_a_batch(self):
+        sizes = []
+        release = threading.Event()
+
+        def function(records):
+            release.wait()
+            sizes.append(len(records))
+            return [record * 2 for record in records]
+
+        batcher = service.MicroBatcher(function, max_batch_size=4,
+                                       max_latency=0.5)
+        futures = [batcher.submit(i) for i in range(6)]
+        release.set()
+        self.assertEqual([0, 2, 4, 6, 8, 10],
+                         [future.result() for future in futures])
+        batcher.close()
+        self.assertEqual([4, 2], sizes)
+
+    def test_errors_reach_every_request(self):
+        def function(records):
+            raise RuntimeError("boom")
+        batcher = service.MicroBatcher(function, max_latency=0.0)
+        future = batcher.submit(1)
+        self.assertRaises(RuntimeError, future.result)
+        batcher.close()
+
+class TestLbolService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = service.LbolService(port=0, max_latency=0.01)
+        self.service.start()
+        self.url = "http://%s:%d" % self.service.address
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def post(self, path, content):
+        request = urllib.request.Request(
+            self.url + path, data=json.dumps(content).encode("utf-8"),
+            headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_lbol_matches_scalar(self):
+        colors = [0.2, 0.5, 0.9, 1.2, 123.0]
+        with ThreadPoolExecutor(len(colors)) as executor:
+            results = list(executor.map(
+                lambda color: self.post("/lbol", make_record(color)),
+                colors))
+        for color, result in zip(colors, results):
+            expected = luminosity.calc_Lbol(color, 0.04, "BminusV", 16.59,
+                                            0.02, 1.54E23, 0.308E23)
+            if expected[0] == -999:
+                self.assertEqual({"Lbol": None, "Lbol_err": None,
+                                  "valid": False}, result)
+            else:
+                self.assertAlmostEqual(1.0, result["Lbol"] / expected[0],
+                                       places=12)
+                self.assertTrue(result["valid"])
+
+        with urllib.request.urlopen(self.url + "/metrics") as response:
+            metrics = json.loads(response.read())
+        self.assertEqual(len(colors), metrics["requests"])
+        self.assertLessEqual(metrics["batches"], len(colors))
+        self.assertGreater(metrics["latency_p99"], 0.0)
+        self.assertGreaterEqual(metrics["latency_p99"],
+                                metrics["latency_p50"])
+        self.assertGreater(metrics["throughput"], 0.0)
+
+    def test_bc(self):
+        result = self.post("/bc", {"color_value": 0.5, "color_err": 0.04,
+                                   "color_type": "VminusI"})
+        expected = bc_polynomial.calc_bolometric_correction(0.5, 0.04,
+                                                            "VminusI")
+        self.assertAlmostEqual(expected[0], result["bc"])
+        self.assertAlmostEqual(expected[1], result["bc_err"])
+
+    def test_bad_request(self):
+        record = make_record(0.5)
+        record["color_type"] = "UminusB"
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.post("/lbol", record)
+        self.assertEqual(400, context.exception.code)
+        context.exception.close()
+
+    def test_bad_content_length(self):
+        connection = http.client.HTTPConnection(*self.service.address)
+        try:
+            for length in ("ten", "-5"):
+                connection.putrequest("POST", "/bc")
+                connection.putheader("Content-Length", length)
+                connection.endheaders()
+                response = connection.getresponse()
+                response.read()
+                self.assertEqual(400, response.status)
+        finally:
+            connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
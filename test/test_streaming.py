@@ -0,0 +1,94 @@
+import unittest
+import asyncio
+import lbol.luminosity as luminosity
+import lbol.streaming as streaming
+
+def make_record(color_value):
+    return {"color_value": color_value, "color_err": 0.04,
+            "color_type": "BminusV", "v_magnitude": 16.59,
+            "v_magnitude_err": 0.02, "distance": 1.54E23,
+            "distance_err": 0.308E23}
+
+class FakeStream(object):
+    """An in-process async stream of records."""
+
+    def __init__(self, records, pause=None, error=None):
+        self.records = records
+        self.pause = pause
+        self.error = error
+        self.produced = 0
+
+    async def __aiter__(self):
+        for i, record in enumerate(self.records):
+            if self.pause is not None and i == self.pause[0]:
+                await self.pause[1].wait()
+            self.produced += 1
+            yield record
+        if self.error is not None:
+            raise self.error
+
+class TestStreamLbol(unittest.IsolatedAsyncioTestCase):
+
+    async def test_results_match_scalar_in_order(self):
+        colors = [0.2, 0.5, 123.0, 0.9, 1.2]
+        stream = FakeStream([make_record(color) for color in colors])
+        results = [result async for result in
+                   streaming.stream_Lbol(stream, max_batch_size=2)]
+        self.assertEqual(colors, [record["color_value"]
+                                  for record, _, _, _ in results])
+        for record, Lbol, Lbol_err, valid in results:
+            expected = luminosity.calc_Lbol(*[record[field] for field
+                                              in streaming.FIELDS])
+            if expected[0] == -999:
+                self.assertFalse(valid)
+            else:
+                self.assertAlmostEqual(1.0, Lbol / expected[0], places=12)
+                self.assertAlmostEqual(1.0, Lbol_err / expected[1],
+                                       places=12)
+
+    async def test_partial_batch_flushed_after_latency(self):
+        resume = asyncio.Event()
+        stream = FakeStream([make_record(0.5)] * 4, pause=(3, resume))
+        results = streaming.stream_Lbol(stream, max_batch_size=100,
+                                        max_latency=0.01)
+        first = [await asyncio.wait_for(results.__anext__(), 1.0)
+                 for _ in range(3)]
+        self.assertEqual(3, len(first))
+        resume.set()
+        rest = [result async for result in results]
+        self.assertEqual(1, len(rest))
+
+    async def test_backpressure_limits_read_ahead(self):
+        stream = FakeStream([make_record(0.5)] * 50)
+        results = streaming.stream_Lbol(stream, max_batch_size=1,
+                                        max_pending=2)
+        await results.__anext__()
+        await asyncio.sleep(0.05)
+        self.assertLess(stream.produced, 10)
+        await results.aclose()
+
+    async def test_bad_records_do_not_stop_the_stream(self):
+        bad_type = dict(make_record(0.5), color_type="UminusB")
+        missing = make_record(0.5)
+        del missing["distance"]
+        records = [make_record(0.2), bad_type, make_record(0.9), missing]
+        errors = []
+        results = [result async for result in streaming.stream_Lbol(
+            FakeStream(records), max_batch_size=3,
+            on_error=lambda record, error: errors.append(record))]
+        self.assertEqual(records, [record for record, _, _, _ in results])
+        self.assertEqual([True, False, True, False],
+                         [valid for _, _, _, valid in results])
+        self.assertEqual([bad_type, missing], errors)
+
+    async def test_source_error_is_raised_after_results(self):
+        stream = FakeStream([make_record(0.5)] * 2,
+                            error=RuntimeError("broker went away"))
+        results = []
+        with self.assertRaises(RuntimeError):
+            async for result in streaming.stream_Lbol(stream):
+                results.append(result)
+        self.assertEqual(2, len(results))
+
+if __name__ == '__main__':
+    unittest.main()